@@ -1,35 +1,115 @@
+import time
+
+_import_start = time.perf_counter()
+
 import bpy
-from bpy.props import CollectionProperty, IntProperty
+from bpy.props import BoolProperty, CollectionProperty, EnumProperty, FloatProperty, IntProperty, StringProperty
+
+from . import props, operators, ui, utils
 
-from . import props, operators, ui
+_import_ms = (time.perf_counter() - _import_start) * 1000.0
+
+# Import + register() together should stay under this. Going over usually means
+# something heavy (NumPy, the engine modules) got imported at module level again.
+STARTUP_BUDGET_MS = 30.0
 
 # Keep the register list together so I don't forget a class later.
 all_classes = props.CLASSES + operators.CLASSES + ui.CLASSES
 
 
+def _autosnapshot_tick():
+    from . import snapshots
+    return snapshots.tick()
+
+
 def register():
+    start = time.perf_counter()
+
+    for c in ui.PREFERENCES_CLASSES:
+        bpy.utils.register_class(c)
+    ui.prepare_panel_category()
+
     for c in all_classes:
         bpy.utils.register_class(c)
 
     # These are on Object because that's where the mesh data sits anyway.
     bpy.types.Object.sculpt_mask_layers = CollectionProperty(type=props.SculptMaskLayerItem)
     bpy.types.Object.sculpt_mask_layers_index = IntProperty(default=0)
+    bpy.types.Object.sculpt_mask_stack_mode = BoolProperty(
+        name="Layer Stack",
+        description="Live mask is the composite of all enabled layers. "
+                    "The current mask is kept as a snapshot when this is turned on",
+        default=False,
+        update=props.stack_update,
+    )
+    bpy.types.Object.sculpt_mask_region = EnumProperty(
+        name="Region",
+        description="Limit the mask operators to part of the mesh",
+        items=props.REGION_ITEMS,
+        default='ALL',
+    )
+    bpy.types.Object.sculpt_mask_region_layer = StringProperty(name="Region Layer", default="")
+    bpy.types.Object.sculpt_mask_region_threshold = FloatProperty(
+        name="Threshold", default=0.5, min=0.0, max=1.0, subtype='FACTOR'
+    )
+    bpy.types.Object.sculpt_mask_region_group = StringProperty(name="Vertex Group", default="")
 
     ui.append_menu_hooks()
-    ui.sync_panel_name()
+    # Nobody paints in background mode, so don't wake up for autosnapshots there.
+    if not bpy.app.background and not bpy.app.timers.is_registered(_autosnapshot_tick):
+        bpy.app.timers.register(_autosnapshot_tick, first_interval=5.0, persistent=True)
+    for handlers in (bpy.app.handlers.undo_post, bpy.app.handlers.redo_post, bpy.app.handlers.load_post):
+        handlers.append(props.on_undo_or_load)
+
+    register_ms = (time.perf_counter() - start) * 1000.0
+    total_ms = _import_ms + register_ms
 
     # Simple log, helpful when Blender silently fails to load add-ons.
-    print("[Sculpt Mask Layers] registered v1.2.1")
+    print(f"[Sculpt Mask Layers] registered v1.2.1 in {total_ms:.1f} ms "
+          f"(import {_import_ms:.1f} ms, register {register_ms:.1f} ms)")
+    if total_ms > STARTUP_BUDGET_MS:
+        print(f"[Sculpt Mask Layers] startup over budget ({STARTUP_BUDGET_MS:.0f} ms)")
 
 
 def unregister():
     ui.remove_menu_hooks()
+    if bpy.app.timers.is_registered(_autosnapshot_tick):
+        bpy.app.timers.unregister(_autosnapshot_tick)
+    for handlers in (bpy.app.handlers.undo_post, bpy.app.handlers.redo_post, bpy.app.handlers.load_post):
+        if props.on_undo_or_load in handlers:
+            handlers.remove(props.on_undo_or_load)
+
+    # Only the modules that were actually used this session need cleanup.
+    snapshots = utils.loaded_module("snapshots")
+    if snapshots:
+        snapshots.clear()
+    history = utils.loaded_module("history")
+    if history:
+        history.clear()
+    regions = utils.loaded_module("regions")
+    if regions:
+        regions.clear()
+    stack = utils.loaded_module("stack")
+    if stack:
+        stack.clear_cache()
+    generators = utils.loaded_module("generators")
+    if generators:
+        generators.clear_cache()
+    utils.clear_attr_name_index()
+    utils.clear_attr_versions()
 
     del bpy.types.Object.sculpt_mask_layers
     del bpy.types.Object.sculpt_mask_layers_index
+    del bpy.types.Object.sculpt_mask_stack_mode
+    del bpy.types.Object.sculpt_mask_region
+    del bpy.types.Object.sculpt_mask_region_layer
+    del bpy.types.Object.sculpt_mask_region_threshold
+    del bpy.types.Object.sculpt_mask_region_group
 
     for c in reversed(all_classes):
         bpy.utils.unregister_class(c)
+    for c in reversed(ui.PREFERENCES_CLASSES):
+        bpy.utils.unregister_class(c)
 
     print("[Sculpt Mask Layers] unregistered")
 
@@ -0,0 +1,33 @@
+import numpy as np
+
+
+def read_point_values(mesh, attr_name, n=None):
+    """Float values of a POINT attribute as float32, or None if it's missing.
+
+    With n given, the result is padded/cut to n values, the same best effort
+    rule copy_attr_values uses for mismatched topology.
+    """
+    attr = mesh.attributes.get(attr_name)
+    if attr is None:
+        return None
+    buf = np.zeros(len(attr.data), dtype=np.float32)
+    attr.data.foreach_get("value", buf)
+    if n is not None and len(buf) != n:
+        out = np.zeros(n, dtype=np.float32)
+        m = min(n, len(buf))
+        out[:m] = buf[:m]
+        buf = out
+    return buf
+
+
+def combine(dst, src, mode):
+    """Same as the apply (0), add (1) and subtract (2) loops in preview_toggle."""
+    if mode == 0:
+        return np.array(src, dtype=np.float32)
+    out = dst + src if mode == 1 else dst - src
+    return np.clip(out, 0.0, 1.0).astype(np.float32, copy=False)
+
+
+def invert(values):
+    """Same as the loop in SCULPTMASK_OT_mask_invert."""
+    return np.clip(1.0 - values, 0.0, 1.0).astype(np.float32, copy=False)
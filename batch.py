@@ -0,0 +1,360 @@
+"""Run mask layer maintenance over many .blend files.
+
+Every file is opened by its own headless Blender, several at a time:
+
+    blender -b --python batch.py -- --job job.json --workers 4 assets/*.blend
+    python batch.py --blender /path/to/blender --job job.json assets/*.blend
+
+A job spec is JSON, either a file or inline:
+
+    {"job": "export", "out_dir": "/tmp/masks"}
+    {"job": "assign", "layer": "Cavity"}
+    {"job": "expr", "layer": "Cavity", "expr": "clip(v * 2, 0, 1)"}
+    {"job": "dedupe"}
+
+"objects": [...] limits any job to those object names. Per-file results and
+timings end up in one JSON report (--report, stdout otherwise).
+"""
+
+import argparse
+import ast
+import importlib
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+ADDON_DIR = os.path.dirname(os.path.abspath(__file__))
+ADDON_MODULE = "sculpt_mask_layers"
+
+# Jobs that change the file and need it saved afterwards.
+WRITING_JOBS = {"assign", "expr", "dedupe"}
+
+
+# ---------------------------------------------------------------------------
+# Worker side, runs inside the headless Blender.
+
+def _load_addon():
+    """Import this add-on from its folder and make sure its properties exist."""
+    import bpy
+
+    addon = sys.modules.get(ADDON_MODULE)
+    if addon is None:
+        spec = importlib.util.spec_from_file_location(
+            ADDON_MODULE,
+            os.path.join(ADDON_DIR, "__init__.py"),
+            submodule_search_locations=[ADDON_DIR],
+        )
+        addon = importlib.util.module_from_spec(spec)
+        sys.modules[ADDON_MODULE] = addon
+        spec.loader.exec_module(addon)
+    if not hasattr(bpy.types.Object, "sculpt_mask_layers"):
+        addon.register()
+    return addon
+
+
+def _target_objects(bpy, spec):
+    names = set(spec.get("objects") or [])
+    for obj in bpy.data.objects:
+        if obj.type != 'MESH':
+            continue
+        if names and obj.name not in names:
+            continue
+        yield obj
+
+
+def _find_layer(obj, name):
+    for i, item in enumerate(obj.sculpt_mask_layers):
+        if item.name == name:
+            return i, item
+    return -1, None
+
+
+def _job_export(bpy, np, arrays, spec):
+    out_dir = spec["out_dir"]
+    stem = os.path.splitext(os.path.basename(bpy.data.filepath))[0]
+    written = 0
+    for obj in _target_objects(bpy, spec):
+        for item in obj.sculpt_mask_layers:
+            values = arrays.read_point_values(obj.data, item.attr_name)
+            if values is None:
+                continue
+            folder = os.path.join(out_dir, stem, obj.name)
+            os.makedirs(folder, exist_ok=True)
+            np.save(os.path.join(folder, f"{item.attr_name}.npy"), values)
+            written += 1
+    return {"layers_exported": written}
+
+
+def _job_assign(bpy, addon, spec):
+    layer = spec["layer"]
+    assigned = 0
+    for obj in _target_objects(bpy, spec):
+        idx, item = _find_layer(obj, layer)
+        if item is None:
+            # add_layers doesn't go through the name update, which only knows
+            # about the active object.
+            addon.props.add_layers(obj, [layer])
+            idx = len(obj.sculpt_mask_layers) - 1
+        addon.operators.assign_mask_to_layer(obj, idx)
+        assigned += 1
+    return {"layers_assigned": assigned}
+
+
+EXPR_FUNCTIONS = (
+    "abs", "clip", "minimum", "maximum", "where", "sqrt", "power", "exp", "log",
+    "sin", "cos", "floor", "ceil", "round",
+)
+
+# Plain arithmetic and comparisons only. No attribute access, subscripts or
+# lambdas, so nothing like v.__class__ can reach past the names we hand in.
+_EXPR_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.Call, ast.keyword,
+    ast.Name, ast.Load, ast.Constant,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.UAdd, ast.USub, ast.Invert, ast.BitAnd, ast.BitOr,
+    ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq,
+)
+
+
+def compile_expr(text):
+    """Compile a layer expression after checking it only uses v, numbers and EXPR_FUNCTIONS.
+
+    This keeps a typo or a copied snippet from doing anything but math; it's
+    not a sandbox against runaway computation, so job specs should still come
+    from someone you trust.
+    """
+    tree = ast.parse(text, mode="eval")
+    allowed = set(EXPR_FUNCTIONS) | {"v"}
+    for node in ast.walk(tree):
+        if not isinstance(node, _EXPR_NODES):
+            raise ValueError(f"'{type(node).__name__}' isn't allowed in an expression.")
+        if isinstance(node, ast.Name) and node.id not in allowed:
+            raise ValueError(f"Unknown name '{node.id}' in expression.")
+        if isinstance(node, ast.Call) and not (isinstance(node.func, ast.Name) and node.func.id in EXPR_FUNCTIONS):
+            raise ValueError("Only the listed functions can be called in an expression.")
+        if isinstance(node, ast.Constant) and type(node.value) not in (int, float, bool):
+            raise ValueError("Only numbers are allowed as constants in an expression.")
+    return compile(tree, "<expr>", "eval")
+
+
+def _job_expr(bpy, np, arrays, addon, spec):
+    namespace = {name: getattr(np, name) for name in EXPR_FUNCTIONS}
+    code = compile_expr(spec["expr"])
+    layer = spec["layer"]
+    changed = 0
+    for obj in _target_objects(bpy, spec):
+        _idx, item = _find_layer(obj, layer)
+        if item is None:
+            continue
+        values = arrays.read_point_values(obj.data, item.attr_name)
+        if values is None:
+            continue
+        result = eval(code, {"__builtins__": {}}, dict(namespace, v=values))
+        result = np.broadcast_to(np.asarray(result, dtype=np.float32), values.shape)
+        # Masks live in 0..1; things like log(v) at 0 or sqrt(v - 1) would
+        # otherwise store inf/NaN in the layer.
+        result = np.clip(np.nan_to_num(result, nan=0.0, posinf=1.0, neginf=0.0), 0.0, 1.0)
+        result = np.ascontiguousarray(result, dtype=np.float32)
+        obj.data.attributes[item.attr_name].data.foreach_set("value", result)
+        # Coverage and the modified stamp are saved with the file, keep them honest.
+        addon.props.touch_layer(item, result)
+        obj.data.update()
+        changed += 1
+    return {"layers_changed": changed}
+
+
+def _job_dedupe(bpy, np, arrays, addon, spec):
+    removed = 0
+    for obj in _target_objects(bpy, spec):
+        # The first (top-most) copy is the one that stays.
+        seen = set()
+        drop = []
+        for i, item in enumerate(obj.sculpt_mask_layers):
+            values = arrays.read_point_values(obj.data, item.attr_name)
+            if values is None:
+                continue
+            data = values.tobytes()
+            if data in seen:
+                drop.append(i)
+            else:
+                seen.add(data)
+        # Backwards so removing doesn't shift the indices still to go.
+        for i in reversed(drop):
+            attr_name = obj.sculpt_mask_layers[i].attr_name
+            obj.sculpt_mask_layers.remove(i)
+            addon.utils.remove_mesh_attribute(obj.data, attr_name)
+            removed += 1
+        obj.sculpt_mask_layers_index = min(obj.sculpt_mask_layers_index, len(obj.sculpt_mask_layers) - 1)
+    return {"layers_removed": removed}
+
+
+def run_job(spec):
+    import bpy
+    import numpy as np
+
+    addon = _load_addon()
+    arrays = importlib.import_module(f"{ADDON_MODULE}.arrays")
+
+    job = spec["job"]
+    if job == "export":
+        result = _job_export(bpy, np, arrays, spec)
+    elif job == "assign":
+        result = _job_assign(bpy, addon, spec)
+    elif job == "expr":
+        result = _job_expr(bpy, np, arrays, addon, spec)
+    elif job == "dedupe":
+        result = _job_dedupe(bpy, np, arrays, addon, spec)
+    else:
+        raise ValueError(f"Unknown job '{job}'.")
+
+    if job in WRITING_JOBS:
+        bpy.ops.wm.save_mainfile()
+    return result
+
+
+def worker_main(args):
+    spec = json.loads(args.job_json)
+    start = time.perf_counter()
+    try:
+        out = {"ok": True, "result": run_job(spec)}
+    except Exception as e:
+        out = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    out["seconds"] = time.perf_counter() - start
+    with open(args.result, "w", encoding="utf-8") as f:
+        json.dump(out, f)
+    return 0 if out["ok"] else 1
+
+
+# ---------------------------------------------------------------------------
+# Coordinator side, plain Python (or Blender's Python via -b --python).
+
+def _load_spec(value):
+    if value.lstrip().startswith("{"):
+        return json.loads(value)
+    with open(value, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _run_one(blender, path, spec_json, timeout):
+    fd, result_path = tempfile.mkstemp(suffix=".json", prefix="sculptmask_")
+    os.close(fd)
+    cmd = [
+        blender, "-b", "--factory-startup", path,
+        "--python", os.path.abspath(__file__),
+        "--", "--worker", "--job-json", spec_json, "--result", result_path,
+    ]
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+        try:
+            with open(result_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            tail = (proc.stderr or proc.stdout or "").strip().splitlines()[-5:]
+            return {"ok": False, "error": f"Blender exited with {proc.returncode}: {' | '.join(tail)}"}
+    except subprocess.TimeoutExpired:
+        return {"ok": False, "error": f"Timed out after {timeout} s"}
+    except OSError as e:
+        # Wrong --blender path and the like; report it per file instead of
+        # taking down the whole run.
+        return {"ok": False, "error": f"Could not run Blender: {e}"}
+    finally:
+        try:
+            os.remove(result_path)
+        except OSError:
+            pass
+
+
+def _process_file(blender, path, spec_json, retries, timeout):
+    start = time.perf_counter()
+    attempts = 0
+    while True:
+        attempts += 1
+        out = _run_one(blender, path, spec_json, timeout)
+        if out.get("ok") or attempts > retries:
+            break
+    out["file"] = path
+    out["attempts"] = attempts
+    out["wall_seconds"] = time.perf_counter() - start
+    return out
+
+
+def coordinator_main(args):
+    blender = args.blender
+    if not blender:
+        try:
+            import bpy
+            blender = bpy.app.binary_path
+        except ImportError:
+            print("--blender is required when not running inside Blender", file=sys.stderr)
+            return 2
+
+    spec = _load_spec(args.job)
+    spec_json = json.dumps(spec)
+    files = [os.path.abspath(p) for p in args.files]
+
+    start = time.perf_counter()
+    results = []
+    # Threads are enough here: each one just waits on its own Blender process.
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = [
+            pool.submit(_process_file, blender, path, spec_json, args.retries, args.timeout)
+            for path in files
+        ]
+        for fut in as_completed(futures):
+            res = fut.result()
+            results.append(res)
+            state = "ok" if res.get("ok") else "FAILED"
+            print(f"[Sculpt Mask Layers] {state} {res['file']} ({res['wall_seconds']:.1f} s)", file=sys.stderr)
+
+    results.sort(key=lambda r: r["file"])
+    report = {
+        "job": spec,
+        "files": results,
+        "failed": sum(1 for r in results if not r.get("ok")),
+        "total_seconds": time.perf_counter() - start,
+    }
+    text = json.dumps(report, indent=2)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 1 if report["failed"] else 0
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(description="Batch mask layer jobs over .blend files.")
+    parser.add_argument("files", nargs="*", help=".blend files to process")
+    parser.add_argument("--job", help="job spec: JSON file or inline JSON")
+    parser.add_argument("--blender", help="Blender executable (defaults to the running one)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--retries", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=1800.0, help="seconds per file and attempt")
+    parser.add_argument("--report", help="write the JSON report here instead of stdout")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--job-json", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if not args.worker and not args.job:
+        parser.error("--job is required")
+    return args
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+        # Inside Blender everything for us comes after "--".
+        if "--" in argv:
+            argv = argv[argv.index("--") + 1:]
+    args = _parse_args(argv)
+    return worker_main(args) if args.worker else coordinator_main(args)
+
+
+if __name__ == "__main__":
+    code = main()
+    sys.exit(code)
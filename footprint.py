@@ -0,0 +1,85 @@
+import bpy
+
+from .utils import ATTR_PREFIX, loaded_module, sanitize_layer_name
+
+# Bytes per element for the attribute types we might run into.
+_TYPE_SIZES = {
+    'FLOAT': 4,
+    'INT': 4,
+    'BOOLEAN': 1,
+    'INT8': 1,
+    'FLOAT2': 8,
+    'INT32_2D': 8,
+    'FLOAT_VECTOR': 12,
+    'FLOAT_COLOR': 16,
+    'BYTE_COLOR': 4,
+    'QUATERNION': 16,
+}
+
+
+def attr_bytes(attr):
+    return len(attr.data) * _TYPE_SIZES.get(attr.data_type, 4)
+
+
+def format_bytes(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024.0
+
+
+def scan(mesh):
+    """Sizes of every mask__* attribute plus orphaned and dangling entries.
+
+    Orphans are mask__* attributes no layer item points at, dangling items point
+    at an attribute that's gone. Every object using this mesh counts, since the
+    attributes are shared between them.
+    """
+    sizes = {}
+    for attr in mesh.attributes:
+        if attr.name.startswith(ATTR_PREFIX):
+            sizes[attr.name] = attr_bytes(attr)
+
+    referenced = set()
+    layers = []
+    dangling = []
+    for obj in bpy.data.objects:
+        if obj.data != mesh:
+            continue
+        for i, item in enumerate(obj.sculpt_mask_layers):
+            if item.attr_name in sizes:
+                referenced.add(item.attr_name)
+                layers.append((obj.name, i, item.name, item.attr_name, sizes[item.attr_name]))
+            else:
+                dangling.append((obj.name, i, item.name, item.attr_name))
+
+    orphans = [(name, size) for name, size in sizes.items() if name not in referenced]
+    return {
+        "layers": layers,
+        "orphans": orphans,
+        "dangling": dangling,
+        "layer_bytes": sum(sizes[name] for name in referenced),
+        "orphan_bytes": sum(size for _name, size in orphans),
+    }
+
+
+def session_bytes():
+    """Memory held by the in-session caches (autosnapshots, layer history)."""
+    total = 0
+    for name in ("snapshots", "history"):
+        mod = loaded_module(name)
+        if mod:
+            total += mod.memory_bytes()
+    return total
+
+
+def match_orphan(item_name, orphan_names):
+    """Best orphan attribute for a dangling item: same sanitized name, suffix allowed."""
+    base = ATTR_PREFIX + sanitize_layer_name(item_name)
+    if base in orphan_names:
+        return base
+    for name in sorted(orphan_names):
+        rest = name[len(base):]
+        if name.startswith(base) and rest[:1] == "_" and rest[1:].isdigit():
+            return name
+    return None
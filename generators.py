@@ -0,0 +1,145 @@
+import numpy as np
+
+from .utils import id_key
+
+AXIS_VECTORS = {
+    'X': (1.0, 0.0, 0.0),
+    'Y': (0.0, 1.0, 0.0),
+    'Z': (0.0, 0.0, 1.0),
+    'NEG_X': (-1.0, 0.0, 0.0),
+    'NEG_Y': (0.0, -1.0, 0.0),
+    'NEG_Z': (0.0, 0.0, -1.0),
+}
+
+# Only a handful of meshes are worked on at once, no need to hold more.
+_CACHE_LIMIT = 4
+
+_input_cache = {}
+
+
+def clear_cache():
+    _input_cache.clear()
+
+
+def mesh_inputs(mesh):
+    """Vertex positions, normals and edges, with normals and curvature reused until the mesh changes.
+
+    Positions and edges are re-read every time and compared in full: a sculpt
+    stroke can move any vertex, and one bulk read is still far cheaper than
+    redoing the normals and curvature.
+    """
+    key = id_key(mesh)
+    n = len(mesh.vertices)
+    co = np.empty(n * 3, dtype=np.float32)
+    edges = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+    mesh.vertices.foreach_get("co", co)
+    mesh.edges.foreach_get("vertices", edges)
+    co = co.reshape(n, 3)
+    edges = edges.reshape(-1, 2)
+
+    entry = _input_cache.get(key)
+    if (
+        entry is not None
+        and entry["co"].shape == co.shape
+        and entry["edges"].shape == edges.shape
+        and np.array_equal(entry["co"], co)
+        and np.array_equal(entry["edges"], edges)
+    ):
+        return entry
+
+    no = np.empty(n * 3, dtype=np.float32)
+    mesh.vertex_normals.foreach_get("vector", no)
+
+    entry = {
+        "co": co,
+        "no": no.reshape(n, 3),
+        "edges": edges,
+        "curvature": None,
+    }
+
+    _input_cache.pop(key, None)
+    _input_cache[key] = entry
+    while len(_input_cache) > _CACHE_LIMIT:
+        del _input_cache[next(iter(_input_cache))]
+    return entry
+
+
+def vertex_curvature(co, no, edges):
+    n = len(co)
+    if n == 0 or len(edges) == 0:
+        return np.zeros(n, dtype=np.float32)
+
+    a = edges[:, 0]
+    b = edges[:, 1]
+    d = co[b] - co[a]
+    length = np.linalg.norm(d, axis=1)
+    length[length == 0.0] = 1.0
+    d /= length[:, None]
+
+    # Positive when the neighbour sits above the tangent plane, i.e. a concave spot.
+    ca = np.einsum("ij,ij->i", no[a], d)
+    cb = -np.einsum("ij,ij->i", no[b], d)
+
+    total = np.bincount(a, weights=ca, minlength=n) + np.bincount(b, weights=cb, minlength=n)
+    count = np.bincount(a, minlength=n) + np.bincount(b, minlength=n)
+    count[count == 0] = 1
+    return (total / count).astype(np.float32)
+
+
+def _cached_curvature(entry):
+    if entry["curvature"] is None:
+        entry["curvature"] = vertex_curvature(entry["co"], entry["no"], entry["edges"])
+    return entry["curvature"]
+
+
+def _robust_scale(values):
+    # A few spikes on bad topology shouldn't flatten the whole mask.
+    if values.size == 0:
+        return 1.0
+    scale = float(np.percentile(np.abs(values), 99.0))
+    return scale if scale > 0.0 else 1.0
+
+
+def _world_arrays(entry, matrix_world):
+    m = np.asarray(matrix_world, dtype=np.float32)
+    rot = m[:3, :3]
+    co = entry["co"] @ rot.T + m[:3, 3]
+    no = entry["no"] @ np.linalg.inv(rot)
+    length = np.linalg.norm(no, axis=1)
+    length[length == 0.0] = 1.0
+    no /= length[:, None]
+    return co, no
+
+
+def generate(mesh, generator, matrix_world, axis='Z', angle=0.785398, contrast=1.0, invert=False):
+    """Compute a per-vertex mask (float32, 0..1) (generator is an operators.GENERATOR_ITEMS key)."""
+    entry = mesh_inputs(mesh)
+    n = len(entry["co"])
+    direction = np.asarray(AXIS_VECTORS[axis], dtype=np.float32)
+
+    if generator in {'CAVITY', 'CONVEX', 'CURVATURE'}:
+        c = _cached_curvature(entry)
+        c = c / _robust_scale(c)
+        if generator == 'CONVEX':
+            c = -c
+        elif generator == 'CURVATURE':
+            c = np.abs(c)
+        values = c
+    elif generator == 'HEIGHT':
+        co, _no = _world_arrays(entry, matrix_world)
+        h = co @ direction
+        lo = float(h.min()) if n else 0.0
+        hi = float(h.max()) if n else 0.0
+        values = (h - lo) / (hi - lo) if hi > lo else np.zeros(n, dtype=np.float32)
+    elif generator == 'DIRECTION':
+        _co, no = _world_arrays(entry, matrix_world)
+        cos_limit = float(np.cos(angle))
+        # Full value when facing the direction, fading out towards the angle limit.
+        values = (no @ direction - cos_limit) / max(1.0 - cos_limit, 1e-6)
+    else:
+        raise ValueError(f"Unknown generator '{generator}'.")
+
+    values = np.clip(values * contrast, 0.0, 1.0)
+    if invert:
+        values = 1.0 - values
+    return values.astype(np.float32)
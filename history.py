@@ -0,0 +1,150 @@
+import time
+import zlib
+
+import numpy as np
+
+from .utils import addon_prefs, id_key
+
+# (mesh, attr_name) -> {"n", "base", "deltas", "used"}
+#   base:   zlib'd float32 values of the oldest revision we still have
+#   deltas: one entry per later assign, only the vertices that changed
+_histories = {}
+
+
+def clear():
+    _histories.clear()
+
+
+def _pack(arr):
+    return zlib.compress(arr.tobytes(), 1)
+
+
+def _unpack(data, dtype):
+    return np.frombuffer(zlib.decompress(data), dtype=dtype)
+
+
+def _delta_bytes(delta):
+    return len(delta["idx"]) + len(delta["val"])
+
+
+def _entry_bytes(entry):
+    return len(entry["base"]) + sum(_delta_bytes(d) for d in entry["deltas"])
+
+
+def memory_bytes():
+    return sum(_entry_bytes(e) for e in _histories.values())
+
+
+def _make_delta(old, new):
+    changed = np.flatnonzero(old != new).astype(np.uint32)
+    return {
+        "time": time.time(),
+        "count": len(changed),
+        "idx": _pack(changed),
+        "val": _pack(new[changed].astype(np.float32)),
+    }
+
+
+def _apply_delta(values, delta):
+    idx = _unpack(delta["idx"], np.uint32)
+    values[idx] = _unpack(delta["val"], np.float32)
+
+
+def _drop_oldest(key, entry):
+    """Fold the oldest delta into the base, or forget the layer if there's none."""
+    if not entry["deltas"]:
+        del _histories[key]
+        return
+    base = _unpack(entry["base"], np.float32).copy()
+    delta = entry["deltas"].pop(0)
+    _apply_delta(base, delta)
+    entry["base"] = _pack(base)
+    # The base now holds the state from when that delta was recorded.
+    entry["base_time"] = delta["time"]
+
+
+def _enforce_limits(key):
+    prefs = addon_prefs()
+    depth = prefs.history_depth if prefs else 16
+    limit = int((prefs.history_limit_mb if prefs else 64.0) * 1024 * 1024)
+
+    entry = _histories.get(key)
+    while entry is not None and len(entry["deltas"]) > depth:
+        _drop_oldest(key, entry)
+
+    # Least recently used layers give up their oldest revisions first.
+    while _histories and memory_bytes() > limit:
+        lru_key = min(_histories, key=lambda k: _histories[k]["used"])
+        _drop_oldest(lru_key, _histories[lru_key])
+
+
+def _latest(entry):
+    values = _unpack(entry["base"], np.float32).copy()
+    for delta in entry["deltas"]:
+        _apply_delta(values, delta)
+    return values
+
+
+def record(mesh, attr_name, old, new):
+    """Remember an assign that turned old into new (both float32, same length).
+
+    If old isn't what we stored last (something wrote the layer without telling
+    us, e.g. undo or a batch job), a resync revision goes in first so every
+    revision still rebuilds to what the layer really held.
+    """
+    key = (id_key(mesh), attr_name)
+    if len(new) != len(old):
+        _histories.pop(key, None)
+        return
+
+    entry = _histories.get(key)
+    if entry is None or entry["n"] != len(old):
+        # First assign we see (or the topology changed): the old values become the base.
+        entry = {
+            "n": len(old),
+            "base": _pack(old.astype(np.float32)),
+            "base_time": time.time(),
+            "deltas": [],
+            "used": 0.0,
+        }
+        _histories[key] = entry
+    else:
+        latest = _latest(entry)
+        if not np.array_equal(latest, old, equal_nan=True):
+            entry["deltas"].append(_make_delta(latest, old))
+
+    entry["deltas"].append(_make_delta(old, new))
+    entry["used"] = time.time()
+    _enforce_limits(key)
+
+
+def revisions(mesh, attr_name):
+    """(revision, timestamp, changed vertex count) oldest first; the last one is current."""
+    entry = _histories.get((id_key(mesh), attr_name))
+    if entry is None:
+        return []
+    out = [(0, entry["base_time"], entry["n"])]
+    for i, d in enumerate(entry["deltas"], start=1):
+        out.append((i, d["time"], d["count"]))
+    return out
+
+
+def values_at(mesh, attr_name, revision):
+    entry = _histories.get((id_key(mesh), attr_name))
+    if entry is None or revision < 0 or revision > len(entry["deltas"]):
+        raise RuntimeError("No such revision.")
+    values = _unpack(entry["base"], np.float32).copy()
+    for delta in entry["deltas"][:revision]:
+        _apply_delta(values, delta)
+    entry["used"] = time.time()
+    return values
+
+
+def rename(mesh, old_name, new_name):
+    entry = _histories.pop((id_key(mesh), old_name), None)
+    if entry is not None:
+        _histories[(id_key(mesh), new_name)] = entry
+
+
+def forget(mesh, attr_name):
+    _histories.pop((id_key(mesh), attr_name), None)
@@ -1,18 +1,52 @@
 import bpy
 from bpy.types import Operator
-from bpy.props import IntProperty
+from bpy.props import BoolProperty, EnumProperty, FloatProperty, IntProperty, StringProperty
 
-from .props import ensure_layer_attr_for_item
+from .props import REGION_ITEMS, add_layers, bump_generation, ensure_layer_attr_for_item, touch_layer
 from .utils import (
     active_mesh_object,
+    addon_prefs,
+    loaded_module,
+    remove_mesh_attribute,
     get_or_create_sculpt_mask_attr,
     copy_attr_values,
     attr_max_abs,
     attrs_equal,
+    ATTR_PREFIX,
     EPS,
 )
 
 
+# The NumPy backed modules (generators, stack, snapshots, visibility, arrays) are
+# imported inside the operators that need them, so enabling the add-on or
+# launching Blender headless doesn't pay for them up front.
+
+def _layers_changed(obj):
+    bump_generation()
+    if obj.sculpt_mask_stack_mode:
+        from . import stack
+        stack.recomposite(obj)
+
+
+class RegionMixin:
+    """Optional region for mask operators; 'ALL' keeps the old whole-mesh path."""
+
+    region: EnumProperty(name="Region", items=REGION_ITEMS, default='ALL')
+    region_layer: StringProperty(name="Region Layer", default="")
+    region_threshold: FloatProperty(name="Threshold", default=0.5, min=0.0, max=1.0, subtype='FACTOR')
+    region_group: StringProperty(name="Vertex Group", default="")
+
+    def region_indices(self, obj):
+        if self.region == 'ALL':
+            return None
+        from . import regions
+
+        layer_item = None
+        if self.region == 'LAYER':
+            layer_item = next((it for it in obj.sculpt_mask_layers if it.name == self.region_layer), None)
+        return regions.resolve(obj, self.region, layer_item, self.region_threshold, self.region_group)
+
+
 class SCULPTMASK_OT_add_layer(Operator):
     bl_idname = "sculptmask.add_layer"
     bl_label = "Add Mask Layer"
@@ -37,6 +71,38 @@ class SCULPTMASK_OT_add_layer(Operator):
 
         obj.sculpt_mask_layers_index = len(obj.sculpt_mask_layers) - 1
         obj.data.update()
+        _layers_changed(obj)
+        return {'FINISHED'}
+
+
+class SCULPTMASK_OT_add_layers(Operator):
+    bl_idname = "sculptmask.add_layers"
+    bl_label = "Add Several Mask Layers"
+    bl_description = "Add a number of empty mask layers at once"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    count: IntProperty(name="Count", default=4, min=1, soft_max=100)
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        obj = active_mesh_object(context)
+        if not obj:
+            self.report({'ERROR'}, "Select a mesh object.")
+            return {'CANCELLED'}
+
+        start = len(obj.sculpt_mask_layers)
+        names = [f"Mask {start + i + 1}" for i in range(self.count)]
+        try:
+            add_layers(obj, names)
+        except Exception as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+
+        obj.sculpt_mask_layers_index = len(obj.sculpt_mask_layers) - 1
+        obj.data.update()
+        _layers_changed(obj)
         return {'FINISHED'}
 
 
@@ -63,11 +129,13 @@ class SCULPTMASK_OT_remove_layer(Operator):
         obj.sculpt_mask_layers_index = min(idx, len(obj.sculpt_mask_layers) - 1)
 
         if attr_name:
-            attr = obj.data.attributes.get(attr_name)
-            if attr:
-                obj.data.attributes.remove(attr)
+            remove_mesh_attribute(obj.data, attr_name)
+            history = loaded_module("history")
+            if history:
+                history.forget(obj.data, attr_name)
 
         obj.data.update()
+        _layers_changed(obj)
         return {'FINISHED'}
 
 
@@ -85,6 +153,7 @@ class SCULPTMASK_OT_move_layer_up(Operator):
             return {'CANCELLED'}
         obj.sculpt_mask_layers.move(idx, idx - 1)
         obj.sculpt_mask_layers_index = idx - 1
+        _layers_changed(obj)
 
         return {'FINISHED'}
 
@@ -103,12 +172,16 @@ class SCULPTMASK_OT_move_layer_down(Operator):
             return {'CANCELLED'}
         obj.sculpt_mask_layers.move(idx, idx + 1)
         obj.sculpt_mask_layers_index = idx + 1
+        _layers_changed(obj)
 
         return {'FINISHED'}
 
 
-def _assign_mask_to_layer(obj, idx):
+def assign_mask_to_layer(obj, idx):
     """Copy current sculpt mask into stored layer attribute."""
+    from . import history, stack
+    from .arrays import read_point_values
+
     mesh = obj.data
     item = obj.sculpt_mask_layers[idx]
     layer_attr_name = ensure_layer_attr_for_item(obj, item)
@@ -116,8 +189,15 @@ def _assign_mask_to_layer(obj, idx):
     dst = mesh.attributes[layer_attr_name]
     src = get_or_create_sculpt_mask_attr(mesh)
 
+    old = read_point_values(mesh, layer_attr_name)
     status = copy_attr_values(src, dst, len(mesh.vertices), allow_mismatch=True)
     mesh.update()
+    new = read_point_values(mesh, layer_attr_name)
+    history.record(mesh, layer_attr_name, old, new)
+    touch_layer(item, new)
+    # The stored values changed, so cached composites below this layer are stale.
+    # I don't recomposite here, the live mask is what the user just painted.
+    stack.invalidate(obj, layer_attr_name)
     return status
 
 
@@ -163,7 +243,7 @@ class SCULPTMASK_OT_assign(Operator):
             return {'CANCELLED'}
 
         try:
-            status = _assign_mask_to_layer(obj, idx)
+            status = assign_mask_to_layer(obj, idx)
             if status == "MISMATCH":
                 self.report({'WARNING'}, "Topology mismatch: assigned with best effort (extra verts set to 0).")
             return {'FINISHED'}
@@ -199,7 +279,7 @@ class SCULPTMASK_OT_assign_overwrite(Operator):
             return {'CANCELLED'}
 
         try:
-            status = _assign_mask_to_layer(obj, idx)
+            status = assign_mask_to_layer(obj, idx)
             if status == "MISMATCH":
                 self.report({'WARNING'}, "Topology mismatch: assigned with best effort (extra verts set to 0).")
             return {'FINISHED'}
@@ -235,7 +315,7 @@ class SCULPTMASK_OT_assign_overwrite(Operator):
             return {'CANCELLED'}
 
 
-class SCULPTMASK_OT_preview_toggle(Operator):
+class SCULPTMASK_OT_preview_toggle(RegionMixin, Operator):
     """Apply a stored layer to the current sculpt mask."""
     bl_idname = "sculptmask.preview_toggle"
     bl_label = "Apply Mask Layer"
@@ -268,6 +348,11 @@ class SCULPTMASK_OT_preview_toggle(Operator):
         mesh = obj.data
         item = obj.sculpt_mask_layers[idx]
 
+        # In stack mode the icon just toggles the layer; the update recomposites.
+        if obj.sculpt_mask_stack_mode:
+            item.enabled = not item.enabled
+            return {'FINISHED'}
+
         if not item.attr_name or item.attr_name not in mesh.attributes:
             self.report({'ERROR'}, "This layer has no stored mask. Use Assign first.")
             return {'CANCELLED'}
@@ -275,6 +360,14 @@ class SCULPTMASK_OT_preview_toggle(Operator):
         src = mesh.attributes[item.attr_name]
         dst = get_or_create_sculpt_mask_attr(mesh)
 
+        try:
+            indices = self.region_indices(obj)
+        except Exception as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        if indices is not None:
+            return self._execute_region(mesh, src, dst, indices)
+
         if self.op_mode == 0:
             copy_attr_values(src, dst, len(mesh.vertices), allow_mismatch=True)
             mesh.update()
@@ -308,6 +401,18 @@ class SCULPTMASK_OT_preview_toggle(Operator):
         mesh.update()
         return {'FINISHED'}
 
+    def _execute_region(self, mesh, src, dst, indices):
+        from .arrays import combine
+        from .regions import RegionValues
+
+        n = min(len(src.data), len(dst.data), len(mesh.vertices))
+        indices = indices[indices < n]
+        src_vals = RegionValues(src, indices).values
+        dst_region = RegionValues(dst, indices)
+        dst_region.write(combine(dst_region.values, src_vals, self.op_mode))
+        mesh.update()
+        return {'FINISHED'}
+
 
 class SCULPTMASK_OT_duplicate_layer(Operator):
     bl_idname = "sculptmask.duplicate_layer"
@@ -331,6 +436,8 @@ class SCULPTMASK_OT_duplicate_layer(Operator):
             self.report({'ERROR'}, "Selected layer has no stored mask to duplicate.")
             return {'CANCELLED'}
 
+        from .arrays import read_point_values
+
         item = obj.sculpt_mask_layers.add()
         item.name = f"{src_item.name}_duplicate"
 
@@ -341,6 +448,8 @@ class SCULPTMASK_OT_duplicate_layer(Operator):
             status = copy_attr_values(src, dst, len(obj.data.vertices), allow_mismatch=True)
             if status == "MISMATCH":
                 self.report({'WARNING'}, "Topology mismatch: duplicated with best effort (extra verts set to 0).")
+            item.tag = src_item.tag
+            touch_layer(item, read_point_values(obj.data, item.attr_name))
         except Exception as e:
             self.report({'ERROR'}, str(e))
             obj.sculpt_mask_layers.remove(len(obj.sculpt_mask_layers) - 1)
@@ -348,10 +457,11 @@ class SCULPTMASK_OT_duplicate_layer(Operator):
 
         obj.sculpt_mask_layers_index = len(obj.sculpt_mask_layers) - 1
         obj.data.update()
+        _layers_changed(obj)
         return {'FINISHED'}
 
 
-class SCULPTMASK_OT_mask_invert(Operator):
+class SCULPTMASK_OT_mask_invert(RegionMixin, Operator):
     bl_idname = "sculptmask.mask_invert"
     bl_label = "Invert"
     bl_description = "Invert the current sculpt mask"
@@ -374,6 +484,21 @@ class SCULPTMASK_OT_mask_invert(Operator):
         n = len(attr.data)
         if n == 0:
             return {'CANCELLED'}
+
+        try:
+            indices = self.region_indices(obj)
+        except Exception as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        if indices is not None:
+            from .arrays import invert
+            from .regions import RegionValues
+
+            region = RegionValues(attr, indices)
+            region.write(invert(region.values))
+            mesh.update()
+            return {'FINISHED'}
+
         buf = [0.0] * n
         attr.data.foreach_get("value", buf)
         # Not sure if Blender clamps this internally, so do it here.
@@ -389,7 +514,7 @@ class SCULPTMASK_OT_mask_invert(Operator):
         return {'FINISHED'}
 
 
-class SCULPTMASK_OT_mask_clear(Operator):
+class SCULPTMASK_OT_mask_clear(RegionMixin, Operator):
     bl_idname = "sculptmask.mask_clear"
     bl_label = "Clear"
     bl_description = "Clear the current sculpt mask"
@@ -412,6 +537,21 @@ class SCULPTMASK_OT_mask_clear(Operator):
         n = len(attr.data)
         if n == 0:
             return {'CANCELLED'}
+
+        try:
+            indices = self.region_indices(obj)
+        except Exception as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        if indices is not None:
+            import numpy as np
+            from .regions import RegionValues
+
+            region = RegionValues(attr, indices)
+            region.write(np.zeros(len(region.indices), dtype=np.float32))
+            mesh.update()
+            return {'FINISHED'}
+
         zeros = [0.0] * n
         attr.data.foreach_set("value", zeros)
         mesh.update()
@@ -478,7 +618,7 @@ class SCULPTMASK_OT_new_layer_from_mask(Operator):
 
         try:
             ensure_layer_attr_for_item(obj, item)
-            status = _assign_mask_to_layer(obj, len(obj.sculpt_mask_layers) - 1)
+            status = assign_mask_to_layer(obj, len(obj.sculpt_mask_layers) - 1)
             if status == "MISMATCH":
                 self.report({'WARNING'}, "Topology mismatch: assigned with best effort (extra verts set to 0).")
         except Exception as e:
@@ -491,8 +631,465 @@ class SCULPTMASK_OT_new_layer_from_mask(Operator):
         return {'FINISHED'}
 
 
+GENERATOR_ITEMS = (
+    ('CAVITY', "Cavity", "Concave areas (creases, pores, folds)"),
+    ('CONVEX', "Edges", "Convex areas (ridges, sharp edges)"),
+    ('CURVATURE', "Curvature", "Both concave and convex areas"),
+    ('HEIGHT', "Height", "Gradient along an axis"),
+    ('DIRECTION', "Direction", "Faces pointing towards a direction"),
+)
+
+
+class SCULPTMASK_OT_generate_mask(Operator):
+    bl_idname = "sculptmask.generate_mask"
+    bl_label = "Generate Mask Layer"
+    bl_description = "Create a new layer from cavity, curvature, height or direction"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    generator: EnumProperty(name="Type", items=GENERATOR_ITEMS, default='CAVITY')
+    axis: EnumProperty(
+        name="Axis",
+        items=(
+            ('X', "X", ""),
+            ('Y', "Y", ""),
+            ('Z', "Z", ""),
+            ('NEG_X', "-X", ""),
+            ('NEG_Y', "-Y", ""),
+            ('NEG_Z', "-Z", ""),
+        ),
+        default='Z',
+    )
+    angle: FloatProperty(name="Angle", subtype='ANGLE', default=0.785398, min=0.0, max=3.141593)
+    contrast: FloatProperty(name="Contrast", default=1.0, min=0.01, soft_max=10.0)
+    invert: BoolProperty(name="Invert", default=False)
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, "generator")
+        if self.generator in {'HEIGHT', 'DIRECTION'}:
+            layout.prop(self, "axis")
+        if self.generator == 'DIRECTION':
+            layout.prop(self, "angle")
+        layout.prop(self, "contrast")
+        layout.prop(self, "invert")
+
+    def execute(self, context):
+        obj = active_mesh_object(context)
+        if not obj:
+            self.report({'ERROR'}, "Select a mesh object.")
+            return {'CANCELLED'}
+
+        from . import generators
+
+        mesh = obj.data
+        try:
+            values = generators.generate(
+                mesh,
+                self.generator,
+                obj.matrix_world,
+                axis=self.axis,
+                angle=self.angle,
+                contrast=self.contrast,
+                invert=self.invert,
+            )
+        except Exception as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+
+        label = {k: n for k, n, _d in GENERATOR_ITEMS}[self.generator]
+        item = obj.sculpt_mask_layers.add()
+        item.name = label
+
+        try:
+            attr_name = ensure_layer_attr_for_item(obj, item)
+            mesh.attributes[attr_name].data.foreach_set("value", values)
+            touch_layer(item, values)
+        except Exception as e:
+            self.report({'ERROR'}, str(e))
+            obj.sculpt_mask_layers.remove(len(obj.sculpt_mask_layers) - 1)
+            return {'CANCELLED'}
+
+        obj.sculpt_mask_layers_index = len(obj.sculpt_mask_layers) - 1
+        mesh.update()
+        _layers_changed(obj)
+        return {'FINISHED'}
+
+
+class SCULPTMASK_OT_stack_recomposite(Operator):
+    bl_idname = "sculptmask.stack_recomposite"
+    bl_label = "Rebuild Live Mask"
+    bl_description = "Rebuild the live sculpt mask from all enabled layers"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        obj = active_mesh_object(context)
+        return obj is not None and obj.sculpt_mask_stack_mode
+
+    def execute(self, context):
+        obj = active_mesh_object(context)
+        if not obj:
+            self.report({'ERROR'}, "Select a mesh object.")
+            return {'CANCELLED'}
+        from . import stack
+
+        try:
+            stack.recomposite(obj)
+        except Exception as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        return {'FINISHED'}
+
+
+class SCULPTMASK_OT_restore_snapshot(Operator):
+    bl_idname = "sculptmask.restore_snapshot"
+    bl_label = "Restore Autosnapshot"
+    bl_description = "Replace the current sculpt mask with an automatically saved one"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    snapshot_index: IntProperty(default=0)
+
+    def execute(self, context):
+        obj = active_mesh_object(context)
+        if not obj:
+            self.report({'ERROR'}, "Select a mesh object.")
+            return {'CANCELLED'}
+
+        from . import snapshots
+
+        prefs = addon_prefs()
+        size = prefs.autosnapshot_count if prefs else 8
+        try:
+            index = self.snapshot_index
+            # Keep whatever is there now so restoring isn't a one-way trip, unless
+            # that would push the picked snapshot out of the ring. Forced, because
+            # the sampled check can miss a small edit we'd then lose for good.
+            if index + 1 < size and snapshots.take_snapshot(obj, size, force=True):
+                index += 1
+            snapshots.restore_snapshot(obj, index)
+        except Exception as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        return {'FINISHED'}
+
+
+def _layer_for_op(op, obj):
+    """layer_index of -1 means the active layer. Reports and returns None if invalid."""
+    idx = op.layer_index if op.layer_index >= 0 else obj.sculpt_mask_layers_index
+    if idx < 0 or idx >= len(obj.sculpt_mask_layers):
+        op.report({'ERROR'}, "No layer selected.")
+        return None
+    item = obj.sculpt_mask_layers[idx]
+    if not item.attr_name or item.attr_name not in obj.data.attributes:
+        op.report({'ERROR'}, "This layer has no stored mask. Use Assign first.")
+        return None
+    return item
+
+
+class SCULPTMASK_OT_layer_threshold(Operator):
+    bl_idname = "sculptmask.layer_threshold"
+    bl_label = "Binarize Layer"
+    bl_description = "Turn a soft layer into a hard 0/1 layer"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    layer_index: IntProperty(default=-1)
+    threshold: FloatProperty(name="Threshold", default=0.5, min=0.0, max=1.0, subtype='FACTOR')
+    invert: BoolProperty(name="Invert", default=False)
+    in_place: BoolProperty(name="In Place", description="Overwrite the layer instead of adding a new one", default=False)
+
+    def execute(self, context):
+        obj = active_mesh_object(context)
+        if not obj:
+            self.report({'ERROR'}, "Select a mesh object.")
+            return {'CANCELLED'}
+        item = _layer_for_op(self, obj)
+        if item is None:
+            return {'CANCELLED'}
+
+        from . import history, stack, visibility
+        from .arrays import read_point_values
+
+        mesh = obj.data
+        old = read_point_values(mesh, item.attr_name)
+        values = visibility.binarize(old, self.threshold, self.invert)
+
+        if self.in_place:
+            mesh.attributes[item.attr_name].data.foreach_set("value", values)
+            history.record(mesh, item.attr_name, old, values)
+            touch_layer(item, values)
+            stack.invalidate(obj, item.attr_name)
+        else:
+            src_name, src_tag = item.name, item.tag
+            new_item = obj.sculpt_mask_layers.add()
+            new_item.name = f"{src_name} binary"
+            try:
+                attr_name = ensure_layer_attr_for_item(obj, new_item)
+                dst = mesh.attributes[attr_name]
+                if len(dst.data) != len(values):
+                    raise RuntimeError("Vertex count mismatch; cannot copy safely.")
+                dst.data.foreach_set("value", values)
+                new_item.tag = src_tag
+                touch_layer(new_item, values)
+            except Exception as e:
+                self.report({'ERROR'}, str(e))
+                obj.sculpt_mask_layers.remove(len(obj.sculpt_mask_layers) - 1)
+                return {'CANCELLED'}
+            obj.sculpt_mask_layers_index = len(obj.sculpt_mask_layers) - 1
+
+        mesh.update()
+        _layers_changed(obj)
+        return {'FINISHED'}
+
+
+class SCULPTMASK_OT_hide_by_layer(Operator):
+    bl_idname = "sculptmask.hide_by_layer"
+    bl_label = "Hide Outside Layer"
+    bl_description = "Hide all geometry where the layer is below the threshold"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    layer_index: IntProperty(default=-1)
+    threshold: FloatProperty(name="Threshold", default=0.5, min=0.0, max=1.0, subtype='FACTOR')
+    invert: BoolProperty(name="Invert", description="Hide inside the layer instead", default=False)
+
+    def execute(self, context):
+        obj = active_mesh_object(context)
+        if not obj:
+            self.report({'ERROR'}, "Select a mesh object.")
+            return {'CANCELLED'}
+        item = _layer_for_op(self, obj)
+        if item is None:
+            return {'CANCELLED'}
+
+        from . import visibility
+        from .arrays import read_point_values
+
+        mesh = obj.data
+        values = read_point_values(mesh, item.attr_name, len(mesh.vertices))
+        try:
+            visible = visibility.hide_outside(mesh, values, self.threshold, self.invert)
+        except Exception as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"{visible} of {len(mesh.polygons)} faces visible.")
+        return {'FINISHED'}
+
+
+class SCULPTMASK_OT_reveal_all(Operator):
+    bl_idname = "sculptmask.reveal_all"
+    bl_label = "Reveal All"
+    bl_description = "Unhide all geometry"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        obj = active_mesh_object(context)
+        if not obj:
+            self.report({'ERROR'}, "Select a mesh object.")
+            return {'CANCELLED'}
+        from . import visibility
+
+        visibility.reveal_all(obj.data)
+        return {'FINISHED'}
+
+
+class SCULPTMASK_OT_restore_revision(Operator):
+    bl_idname = "sculptmask.restore_revision"
+    bl_label = "Restore Layer Revision"
+    bl_description = "Put an earlier assigned version back into the layer (kept as a new revision)"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    layer_index: IntProperty(default=-1)
+    revision: IntProperty(default=0, min=0)
+
+    def execute(self, context):
+        obj = active_mesh_object(context)
+        if not obj:
+            self.report({'ERROR'}, "Select a mesh object.")
+            return {'CANCELLED'}
+        item = _layer_for_op(self, obj)
+        if item is None:
+            return {'CANCELLED'}
+
+        from . import history, stack
+        from .arrays import read_point_values
+
+        mesh = obj.data
+        attr_name = item.attr_name
+        try:
+            values = history.values_at(mesh, attr_name, self.revision)
+            old = read_point_values(mesh, attr_name)
+            if len(old) != len(values):
+                raise RuntimeError("Vertex count changed since this revision was stored.")
+            mesh.attributes[attr_name].data.foreach_set("value", values)
+        except Exception as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+
+        history.record(mesh, attr_name, old, values)
+        touch_layer(item, values)
+        stack.invalidate(obj, attr_name)
+        mesh.update()
+        _layers_changed(obj)
+        return {'FINISHED'}
+
+
+class SCULPTMASK_OT_clear_history(Operator):
+    bl_idname = "sculptmask.clear_history"
+    bl_label = "Clear Layer History"
+    bl_description = "Forget all stored revisions of every layer"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        history = loaded_module("history")
+        if history:
+            history.clear()
+        return {'FINISHED'}
+
+
+class SCULPTMASK_OT_inspect_layers(Operator):
+    bl_idname = "sculptmask.inspect_layers"
+    bl_label = "Mask Layer Footprint"
+    bl_description = "Show how much memory the mask layers take and find orphaned or broken entries"
+    bl_options = {'REGISTER'}
+
+    @classmethod
+    def poll(cls, context):
+        return active_mesh_object(context) is not None
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self, width=480)
+
+    def draw(self, context):
+        from .footprint import format_bytes, scan, session_bytes
+
+        layout = self.layout
+        obj = active_mesh_object(context)
+        if not obj:
+            return
+        report = scan(obj.data)
+
+        col = layout.column(align=True)
+        col.label(text=f"Layers: {len(report['layers'])} ({format_bytes(report['layer_bytes'])})")
+        col.label(text=f"Orphaned attributes: {len(report['orphans'])} ({format_bytes(report['orphan_bytes'])})")
+        col.label(text=f"Layers with missing data: {len(report['dangling'])}")
+        col.label(text=f"Snapshots + history (this session): {format_bytes(session_bytes())}")
+
+        box = layout.box()
+        col = box.column(align=True)
+        for obj_name, _i, name, _attr_name, size in sorted(report["layers"], key=lambda r: -r[4]):
+            row = col.row()
+            row.label(text=f"{name}" if obj_name == obj.name else f"{name} ({obj_name})")
+            row.label(text=format_bytes(size))
+        for attr_name, size in report["orphans"]:
+            row = col.row()
+            row.label(text=attr_name, icon='ORPHAN_DATA')
+            row.label(text=format_bytes(size))
+        for obj_name, _i, name, attr_name in report["dangling"]:
+            row = col.row()
+            row.label(text=f"{name} ({obj_name})", icon='ERROR')
+            row.label(text=attr_name or "no attribute")
+
+        row = layout.row(align=True)
+        row.operator("sculptmask.relink_layers", icon='LINKED')
+        row.operator("sculptmask.purge_orphans", icon='TRASH')
+
+    def execute(self, context):
+        return {'FINISHED'}
+
+
+class SCULPTMASK_OT_purge_orphans(Operator):
+    bl_idname = "sculptmask.purge_orphans"
+    bl_label = "Purge Orphans"
+    bl_description = "Delete mask attributes no layer uses and layers whose data is gone"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    remove_dangling: BoolProperty(name="Remove Broken Layers", default=True)
+
+    def execute(self, context):
+        obj = active_mesh_object(context)
+        if not obj:
+            self.report({'ERROR'}, "Select a mesh object.")
+            return {'CANCELLED'}
+
+        from .footprint import format_bytes, scan
+
+        mesh = obj.data
+        report = scan(mesh)
+        history = loaded_module("history")
+        for attr_name, _size in report["orphans"]:
+            remove_mesh_attribute(mesh, attr_name)
+            if history:
+                history.forget(mesh, attr_name)
+
+        removed_items = 0
+        if self.remove_dangling:
+            # Highest index first per object so the rest stay valid.
+            for obj_name, i, _name, _attr_name in sorted(report["dangling"], key=lambda r: (r[0], -r[1])):
+                owner = bpy.data.objects[obj_name]
+                owner.sculpt_mask_layers.remove(i)
+                owner.sculpt_mask_layers_index = min(
+                    owner.sculpt_mask_layers_index, len(owner.sculpt_mask_layers) - 1
+                )
+                removed_items += 1
+
+        mesh.update()
+        _layers_changed(obj)
+        self.report(
+            {'INFO'},
+            f"Removed {len(report['orphans'])} attributes ({format_bytes(report['orphan_bytes'])}) "
+            f"and {removed_items} broken layers.",
+        )
+        return {'FINISHED'}
+
+
+class SCULPTMASK_OT_relink_layers(Operator):
+    bl_idname = "sculptmask.relink_layers"
+    bl_label = "Relink"
+    bl_description = (
+        "Point broken layers back at a matching orphaned attribute and add the remaining "
+        "orphans as new layers"
+    )
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        obj = active_mesh_object(context)
+        if not obj:
+            self.report({'ERROR'}, "Select a mesh object.")
+            return {'CANCELLED'}
+
+        from .arrays import read_point_values
+        from .footprint import match_orphan, scan
+
+        mesh = obj.data
+        report = scan(mesh)
+        orphans = {name for name, _size in report["orphans"]}
+
+        relinked = 0
+        for obj_name, i, name, _attr_name in report["dangling"]:
+            match = match_orphan(name, orphans)
+            if match is None:
+                continue
+            item = bpy.data.objects[obj_name].sculpt_mask_layers[i]
+            item.attr_name = match
+            # The item now shows different values, so coverage and the region stamp must follow.
+            touch_layer(item, read_point_values(mesh, match))
+            orphans.discard(match)
+            relinked += 1
+
+        for attr_name in sorted(orphans):
+            item = obj.sculpt_mask_layers.add()
+            item.attr_name = attr_name
+            # Skip layer_name_update, the attribute already has the right name.
+            item["name"] = attr_name[len(ATTR_PREFIX):] or attr_name
+            touch_layer(item, read_point_values(mesh, attr_name))
+
+        _layers_changed(obj)
+        self.report({'INFO'}, f"Relinked {relinked} layers, recovered {len(orphans)} orphaned attributes.")
+        return {'FINISHED'}
+
+
 CLASSES = (
     SCULPTMASK_OT_add_layer,
+    SCULPTMASK_OT_add_layers,
     SCULPTMASK_OT_remove_layer,
     SCULPTMASK_OT_move_layer_up,
     SCULPTMASK_OT_move_layer_down,
@@ -504,4 +1101,15 @@ CLASSES = (
     SCULPTMASK_OT_mask_clear,
     SCULPTMASK_OT_mask_filter,
     SCULPTMASK_OT_new_layer_from_mask,
+    SCULPTMASK_OT_generate_mask,
+    SCULPTMASK_OT_stack_recomposite,
+    SCULPTMASK_OT_restore_snapshot,
+    SCULPTMASK_OT_layer_threshold,
+    SCULPTMASK_OT_hide_by_layer,
+    SCULPTMASK_OT_reveal_all,
+    SCULPTMASK_OT_restore_revision,
+    SCULPTMASK_OT_clear_history,
+    SCULPTMASK_OT_inspect_layers,
+    SCULPTMASK_OT_purge_orphans,
+    SCULPTMASK_OT_relink_layers,
 )
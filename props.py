@@ -1,10 +1,17 @@
+import time
+
 import bpy
+from bpy.app.handlers import persistent
 from bpy.types import PropertyGroup
-from bpy.props import StringProperty
+from bpy.props import BoolProperty, EnumProperty, FloatProperty, IntProperty, StringProperty
 
 from .utils import (
     active_mesh_object,
+    addon_prefs,
+    bump_attr_version,
+    loaded_module,
     unique_attr_name,
+    unique_attr_names,
     sanitize_layer_name,
     ensure_float_point_attr,
     rename_mesh_attribute,
@@ -12,9 +19,115 @@ from .utils import (
 )
 
 
+# Enum items live here and not in stack.py so registering doesn't pull in NumPy.
+BLEND_ITEMS = (
+    ('MIX', "Mix", "Replace the layers above with this layer"),
+    ('ADD', "Add", "Add this layer to the layers above"),
+    ('SUBTRACT', "Subtract", "Subtract this layer from the layers above"),
+    ('MULTIPLY', "Multiply", "Multiply the layers above by this layer"),
+    ('LIGHTEN', "Lighten", "Keep the larger value"),
+    ('DARKEN', "Darken", "Keep the smaller value"),
+)
+
+
+REGION_ITEMS = (
+    ('ALL', "Whole Mesh", "Work on every vertex"),
+    ('VISIBLE', "Visible", "Only vertices that aren't hidden"),
+    ('LAYER', "Layer", "Only where a stored layer is above the threshold"),
+    ('VERTEX_GROUP', "Vertex Group", "Only vertices in a vertex group"),
+)
+
+
+# Bumped whenever layer names, tags or stored values change. The layer list
+# caches its filter/sort result on this instead of re-checking every item.
+_generation = 0
+
+
+def bump_generation(*_args):
+    global _generation
+    _generation += 1
+
+
+@persistent
+def on_undo_or_load(*_args):
+    # Undo swaps the layer collections and attribute values under us without
+    # any update callback, so nothing cached from the old values can be trusted.
+    bump_generation()
+    stack = loaded_module("stack")
+    if stack:
+        stack.clear_cache()
+    regions = loaded_module("regions")
+    if regions:
+        regions.clear()
+    generators = loaded_module("generators")
+    if generators:
+        generators.clear_cache()
+
+
+def layers_generation():
+    return _generation
+
+
+def touch_layer(item, values=None):
+    """Refresh the metadata the layer list sorts on after the stored values changed."""
+    item.modified = int(time.time())
+    if item.attr_name:
+        bump_attr_version(item.id_data.data, item.attr_name)
+    if values is not None:
+        item.coverage = float(values.mean()) if len(values) else 0.0
+    bump_generation()
+
+
+def stack_update(self, context):
+    # self is either a layer item or the object itself; both have id_data.
+    obj = self.id_data
+    if obj is None or obj.type != 'MESH' or not obj.sculpt_mask_stack_mode:
+        return
+    if self == obj:
+        # Stack mode was just turned on and is about to overwrite the live mask,
+        # so keep it restorable from the snapshot menu.
+        from . import snapshots
+        prefs = addon_prefs()
+        snapshots.take_snapshot(obj, prefs.autosnapshot_count if prefs else 8, force=True)
+    from . import stack
+    stack.recomposite(obj)
+
+
 class SculptMaskLayerItem(PropertyGroup):
     name: StringProperty(name="Name", default="Mask")
     attr_name: StringProperty(name="Attribute", default="")
+    enabled: BoolProperty(
+        name="Enabled",
+        description="Include this layer in the live mask (stack mode)",
+        default=True,
+        update=stack_update,
+    )
+    blend_mode: EnumProperty(
+        name="Blend",
+        description="How this layer combines with the layers above it (stack mode)",
+        items=BLEND_ITEMS,
+        default='ADD',
+        update=stack_update,
+    )
+    opacity: FloatProperty(
+        name="Opacity",
+        default=1.0,
+        min=0.0,
+        max=1.0,
+        subtype='FACTOR',
+        update=stack_update,
+    )
+    tag: StringProperty(
+        name="Tag",
+        description="Group name used to filter the layer list",
+        default="",
+        update=bump_generation,
+    )
+    # Cached so sorting doesn't have to read every attribute on redraw.
+    coverage: FloatProperty(name="Coverage", default=0.0, subtype='FACTOR')
+    # Whole seconds: a float property is only float32, which rounds today's
+    # timestamps to 128 s steps.
+    modified: IntProperty(name="Modified", default=0)
 
 
 def ensure_layer_attr_for_item(obj, item):
@@ -29,6 +142,25 @@ def ensure_layer_attr_for_item(obj, item):
     return item.attr_name
 
 
+def add_layers(obj, names):
+    """Create one layer (item + attribute) per name in a single pass."""
+    mesh = obj.data
+    bases = [ATTR_PREFIX + sanitize_layer_name(name) for name in names]
+    attr_names = unique_attr_names(mesh, bases)
+
+    items = []
+    for name, attr_name in zip(names, attr_names):
+        ensure_float_point_attr(mesh, attr_name)
+        item = obj.sculpt_mask_layers.add()
+        item.attr_name = attr_name
+        # Set through the ID property so layer_name_update doesn't allocate again.
+        item["name"] = name
+        item.modified = int(time.time())
+        items.append(item)
+    bump_generation()
+    return items
+
+
 def layer_name_update(self, context):
     obj = active_mesh_object(context)
     if not obj:
@@ -46,9 +178,14 @@ def layer_name_update(self, context):
     desired = ATTR_PREFIX + sanitize_layer_name(self.name)
     desired = unique_attr_name(mesh, desired) if desired != self.attr_name else desired
 
-    new_name = rename_mesh_attribute(mesh, self.attr_name, desired)
+    old_name = self.attr_name
+    new_name = rename_mesh_attribute(mesh, old_name, desired)
     self.attr_name = new_name
+    history = loaded_module("history")
+    if history:
+        history.rename(mesh, old_name, new_name)
     mesh.update()
+    bump_generation()
 
 
 SculptMaskLayerItem.__annotations__["name"] = StringProperty(
@@ -0,0 +1,131 @@
+import numpy as np
+
+from .visibility import HIDE_VERT_ATTR
+from .utils import attr_version, id_key
+
+# Below this fraction of the mesh we touch values one by one instead of reading
+# and writing the whole attribute. One data[i].value costs somewhere around a
+# few hundred bulk-copied floats, so this only pays off for really small regions.
+SPARSE_FRACTION = 1.0 / 4096.0
+
+_cache = {}
+
+
+def clear():
+    _cache.clear()
+
+
+def invalidate(mesh):
+    key = id_key(mesh)
+    for k in [k for k in _cache if k[0] == key]:
+        del _cache[k]
+
+
+def _visible_indices(mesh):
+    attr = mesh.attributes.get(HIDE_VERT_ATTR)
+    n = len(mesh.vertices)
+    if attr is None:
+        return np.arange(n, dtype=np.int64)
+    hidden = np.empty(len(attr.data), dtype=bool)
+    attr.data.foreach_get("value", hidden)
+    return np.flatnonzero(~hidden[:n])
+
+
+def _layer_indices(mesh, attr_name, threshold):
+    attr = mesh.attributes.get(attr_name)
+    if attr is None:
+        raise RuntimeError("The region layer has no stored mask.")
+    values = np.empty(len(attr.data), dtype=np.float32)
+    attr.data.foreach_get("value", values)
+    return np.flatnonzero(values[:len(mesh.vertices)] >= threshold)
+
+
+def _group_indices(obj, group_name):
+    vg = obj.vertex_groups.get(group_name)
+    if vg is None:
+        raise RuntimeError(f"Vertex group '{group_name}' not found.")
+    gi = vg.index
+    # No foreach access for vertex groups, so this has to be a Python loop.
+    found = [
+        v.index for v in obj.data.vertices
+        if any(g.group == gi and g.weight > 0.0 for g in v.groups)
+    ]
+    return np.asarray(found, dtype=np.int64)
+
+
+def resolve(obj, region, layer_item=None, threshold=0.5, group_name=""):
+    """Sorted vertex indices of the region, or None for the whole mesh.
+
+    Only layer regions are cached. Hiding and weight painting with Blender's own
+    tools don't tell us anything, and a bool foreach_get of the hide state is
+    cheap enough to do every time.
+    """
+    if region == 'ALL':
+        return None
+    mesh = obj.data
+    n = len(mesh.vertices)
+
+    if region == 'VISIBLE':
+        if mesh.attributes.get(HIDE_VERT_ATTR) is None:
+            return None
+        return _visible_indices(mesh)
+    if region == 'VERTEX_GROUP':
+        return _group_indices(obj, group_name)
+
+    if region != 'LAYER':
+        raise ValueError(f"Unknown region '{region}'.")
+
+    if layer_item is None or not layer_item.attr_name:
+        raise RuntimeError("Pick a layer for the region.")
+    # touch_layer bumps the attribute version on every write to the layer.
+    version = attr_version(mesh, layer_item.attr_name)
+    key = (id_key(mesh), region, n, layer_item.attr_name, round(threshold, 6), version)
+    indices = _cache.get(key)
+    if indices is not None:
+        return indices
+
+    indices = _layer_indices(mesh, layer_item.attr_name, threshold)
+
+    # Older entries for the same layer region are stale now.
+    for k in [k for k in _cache if k[:2] == key[:2]]:
+        del _cache[k]
+    _cache[key] = indices
+    return indices
+
+
+def is_sparse(count, total):
+    return count < total * SPARSE_FRACTION
+
+
+class RegionValues:
+    """Values of one float POINT attribute at the region indices.
+
+    Small regions go through per-element access, big ones through a single
+    foreach_get/foreach_set of the whole attribute.
+    """
+
+    def __init__(self, attr, indices):
+        self.attr = attr
+        n = len(attr.data)
+        self.indices = indices[indices < n]
+        self.full = None
+        if is_sparse(len(self.indices), n):
+            data = attr.data
+            self.values = np.fromiter(
+                (data[i].value for i in self.indices.tolist()),
+                dtype=np.float32,
+                count=len(self.indices),
+            )
+        else:
+            self.full = np.empty(n, dtype=np.float32)
+            attr.data.foreach_get("value", self.full)
+            self.values = self.full[self.indices]
+
+    def write(self, values):
+        if self.full is None:
+            data = self.attr.data
+            for i, v in zip(self.indices.tolist(), values.tolist()):
+                data[i].value = v
+        else:
+            self.full[self.indices] = values
+            self.attr.data.foreach_set("value", self.full)
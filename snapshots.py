@@ -0,0 +1,141 @@
+import time
+import zlib
+from collections import deque
+
+import bpy
+import numpy as np
+
+from .utils import SCULPT_MASK_ATTR, addon_prefs, id_key
+
+# How many mask values we peek at per tick before deciding to do a full read.
+_SAMPLE_COUNT = 1024
+_QUANT = 65535.0
+
+_states = {}
+
+
+def clear():
+    _states.clear()
+
+
+def _state_for(obj, n, size):
+    key = id_key(obj)
+    state = _states.get(key)
+    if state is None or state["n"] != n:
+        # Topology changed (or first time): old snapshots can't be restored anyway.
+        state = {"n": n, "ring": deque(maxlen=size), "last": None, "offset": 0}
+        _states[key] = state
+    elif state["ring"].maxlen != size:
+        state["ring"] = deque(state["ring"], maxlen=size)
+    return state
+
+
+def _quantize(values):
+    # NaN can get in through a layer written outside the add-on; store it as 0.
+    values = np.nan_to_num(values, nan=0.0)
+    return np.round(np.clip(values, 0.0, 1.0) * _QUANT).astype(np.uint16)
+
+
+def _sample_changed(attr, state):
+    """Compare a strided sample of the live mask with the last snapshot."""
+    last = state["last"]
+    if last is None:
+        return True
+    n = state["n"]
+    stride = max(1, n // _SAMPLE_COUNT)
+    # Rotate the start so over a few ticks every vertex gets looked at.
+    offset = state["offset"] % stride
+    state["offset"] = offset + 1
+    data = attr.data
+    for i in range(offset, n, stride):
+        v = data[i].value
+        if v != v:
+            v = 0.0  # NaN, same as _quantize
+        q = int(round(min(max(v, 0.0), 1.0) * _QUANT))
+        if q != last[i]:
+            return True
+    return False
+
+
+def take_snapshot(obj, size, force=False):
+    """Store the live mask in the ring if it changed. Returns True if stored."""
+    mesh = obj.data
+    attr = mesh.attributes.get(SCULPT_MASK_ATTR)
+    if attr is None:
+        return False
+    n = len(attr.data)
+    if n == 0:
+        return False
+
+    state = _state_for(obj, n, size)
+    if not force and not _sample_changed(attr, state):
+        return False
+
+    buf = np.empty(n, dtype=np.float32)
+    attr.data.foreach_get("value", buf)
+    q = _quantize(buf)
+    if state["last"] is not None and np.array_equal(q, state["last"]):
+        return False
+
+    state["last"] = q
+    state["ring"].append({
+        "time": time.time(),
+        "n": n,
+        "data": zlib.compress(q.tobytes(), 1),
+    })
+    return True
+
+
+def snapshots_for(obj):
+    """Newest first."""
+    state = _states.get(id_key(obj))
+    if state is None:
+        return []
+    return list(reversed(state["ring"]))
+
+
+def restore_snapshot(obj, index):
+    snaps = snapshots_for(obj)
+    if index < 0 or index >= len(snaps):
+        raise RuntimeError("No such snapshot.")
+    snap = snaps[index]
+
+    mesh = obj.data
+    attr = mesh.attributes.get(SCULPT_MASK_ATTR)
+    if attr is None or len(attr.data) != snap["n"]:
+        raise RuntimeError("Vertex count changed since this snapshot was taken.")
+
+    q = np.frombuffer(zlib.decompress(snap["data"]), dtype=np.uint16)
+    attr.data.foreach_set("value", q.astype(np.float32) / _QUANT)
+    # The restored mask is now the reference, otherwise the next tick re-stores it.
+    _states[id_key(obj)]["last"] = q.copy()
+    mesh.update()
+
+
+def memory_bytes():
+    total = 0
+    for state in _states.values():
+        total += sum(len(s["data"]) for s in state["ring"])
+        if state["last"] is not None:
+            total += state["last"].nbytes
+    return total
+
+
+def tick():
+    """Timer body; returns the delay until the next call."""
+    prefs = addon_prefs()
+    if prefs is None:
+        return 5.0
+    interval = max(1.0, prefs.autosnapshot_interval)
+    if not prefs.autosnapshot:
+        return interval
+
+    try:
+        obj = bpy.context.view_layer.objects.active
+        if obj is not None and obj.type == 'MESH' and obj.mode == 'SCULPT':
+            take_snapshot(obj, prefs.autosnapshot_count)
+    except Exception as e:
+        # A failing timer gets removed by Blender, so just log and keep going.
+        print(f"[Sculpt Mask Layers] autosnapshot failed: {e}")
+    return interval
+
@@ -0,0 +1,106 @@
+import math
+
+import numpy as np
+
+from .arrays import read_point_values
+from .utils import get_or_create_sculpt_mask_attr, id_key
+
+# Upper bound for the cached prefix composites of one object. Past that we only
+# keep every k-th prefix and re-blend the few layers in between.
+_PREFIX_BUDGET_BYTES = 512 * 1024 * 1024
+
+_stacks = {}
+
+
+def clear_cache():
+    _stacks.clear()
+
+
+def _layer_key(item):
+    return (item.attr_name, item.enabled, item.blend_mode, round(item.opacity, 6))
+
+
+def blend(base, values, mode, opacity):
+    if mode == 'ADD':
+        out = base + values
+    elif mode == 'SUBTRACT':
+        out = base - values
+    elif mode == 'MULTIPLY':
+        out = base * values
+    elif mode == 'LIGHTEN':
+        out = np.maximum(base, values)
+    elif mode == 'DARKEN':
+        out = np.minimum(base, values)
+    else:
+        out = values
+    out = np.clip(out, 0.0, 1.0)
+    if opacity < 1.0:
+        out = base + (out - base) * opacity
+    return out.astype(np.float32, copy=False)
+
+
+def invalidate(obj, attr_name=None):
+    """Drop cached composites from the layer holding attr_name (or all of them)."""
+    state = _stacks.get(id_key(obj))
+    if state is None:
+        return
+    if attr_name is None:
+        _stacks.pop(id_key(obj), None)
+        return
+    keys = state["keys"]
+    for i, key in enumerate(keys):
+        if key is not None and key[0] == attr_name:
+            keys[i] = None
+            return
+
+
+def recomposite(obj):
+    """Write the composite of the enabled layers into .sculpt_mask.
+
+    Only layers from the first changed one downwards are re-read and re-blended;
+    everything above comes from the cached prefix composites.
+    """
+    mesh = obj.data
+    n = len(mesh.vertices)
+    key = id_key(obj)
+
+    state = _stacks.get(key)
+    if state is None or state["n"] != n:
+        state = {"n": n, "keys": [], "prefix": {}}
+        _stacks[key] = state
+
+    items = obj.sculpt_mask_layers
+    keys = [_layer_key(item) for item in items]
+    old_keys = state["keys"]
+
+    start = 0
+    limit = min(len(keys), len(old_keys))
+    while start < limit and keys[start] == old_keys[start]:
+        start += 1
+
+    prefix = state["prefix"]
+    for i in [i for i in prefix if i >= start]:
+        del prefix[i]
+
+    restart = start - 1
+    while restart >= 0 and restart not in prefix:
+        restart -= 1
+    comp = prefix[restart] if restart >= 0 else np.zeros(n, dtype=np.float32)
+
+    stride = max(1, math.ceil(len(keys) * n * 4 / _PREFIX_BUDGET_BYTES))
+    for i in range(restart + 1, len(keys)):
+        item = items[i]
+        if item.enabled and item.attr_name:
+            values = read_point_values(mesh, item.attr_name, n)
+            if values is not None:
+                comp = blend(comp, values, item.blend_mode, item.opacity)
+        if (i + 1) % stride == 0 or i == len(keys) - 1:
+            prefix[i] = comp
+
+    state["keys"] = keys
+
+    dst = get_or_create_sculpt_mask_attr(mesh)
+    if len(dst.data) == n:
+        dst.data.foreach_set("value", comp)
+    mesh.update()
+    return comp
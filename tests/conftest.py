@@ -0,0 +1,33 @@
+import importlib
+import os
+import sys
+import types
+
+import pytest
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = "sculpt_mask_layers"
+
+
+def _install_package():
+    # The engine modules only need "import bpy" to succeed, plus an empty add-on
+    # list so addon_prefs() returns None and the defaults apply. The package
+    # itself is set up by hand so __init__.py (which registers UI classes) never runs.
+    if "bpy" not in sys.modules:
+        bpy = types.ModuleType("bpy")
+        bpy.context = types.SimpleNamespace(preferences=types.SimpleNamespace(addons={}))
+        sys.modules["bpy"] = bpy
+    if PACKAGE not in sys.modules:
+        pkg = types.ModuleType(PACKAGE)
+        pkg.__path__ = [ADDON_DIR]
+        sys.modules[PACKAGE] = pkg
+
+
+_install_package()
+
+
+@pytest.fixture
+def addon():
+    """Lazily imported add-on modules: addon("arrays"), addon("utils"), ..."""
+    pytest.importorskip("numpy")
+    return lambda name: importlib.import_module(f"{PACKAGE}.{name}")
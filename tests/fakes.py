@@ -0,0 +1,189 @@
+"""Small stand-in for the bits of Blender's mesh/attribute API the add-on uses.
+
+Values are kept in float32 storage like real FLOAT attributes, and foreach_get /
+foreach_set insist on an exact length, so rounding and length bugs show up here
+the same way they would in Blender.
+"""
+
+from array import array
+import itertools
+
+_uids = itertools.count(1)
+
+_TYPECODES = {'FLOAT': 'f', 'BOOLEAN': 'b', 'INT': 'i'}
+
+
+class FakeElement:
+    __slots__ = ("_data", "_index")
+
+    def __init__(self, data, index):
+        self._data = data
+        self._index = index
+
+    @property
+    def value(self):
+        v = self._data._values[self._index]
+        return bool(v) if self._data._typecode == 'b' else v
+
+    @value.setter
+    def value(self, v):
+        self._data._values[self._index] = v
+
+
+class FakeAttributeData:
+    def __init__(self, typecode, size):
+        self._typecode = typecode
+        self._values = array(typecode, [0] * size)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self._values)
+        if not 0 <= index < len(self._values):
+            raise IndexError("attribute index out of range")
+        return FakeElement(self, index)
+
+    def foreach_get(self, prop, buf):
+        assert prop == "value"
+        if len(buf) != len(self._values):
+            raise RuntimeError("foreach_get: array length mismatch")
+        buf[:] = self._values.tolist()
+
+    def foreach_set(self, prop, buf):
+        assert prop == "value"
+        if len(buf) != len(self._values):
+            raise RuntimeError("foreach_set: array length mismatch")
+        if self._typecode == 'f':
+            self._values = array('f', [float(v) for v in buf])
+        else:
+            self._values = array(self._typecode, [int(v) for v in buf])
+
+
+class FakeAttribute:
+    def __init__(self, name, data_type, domain, size, owner=None):
+        self._name = name
+        self._owner = owner
+        self.data_type = data_type
+        self.domain = domain
+        self.data = FakeAttributeData(_TYPECODES[data_type], size)
+
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, value):
+        attrs = self._owner._attrs if self._owner is not None else None
+        if attrs is not None:
+            if value in attrs and value != self._name:
+                raise RuntimeError(f"attribute '{value}' exists")
+            del attrs[self._name]
+            attrs[value] = self
+        self._name = value
+
+
+class FakeAttributes:
+    def __init__(self, mesh):
+        self._mesh = mesh
+        self._attrs = {}
+
+    def __len__(self):
+        return len(self._attrs)
+
+    def __iter__(self):
+        return iter(list(self._attrs.values()))
+
+    def __contains__(self, name):
+        return name in self._attrs
+
+    def __getitem__(self, name):
+        return self._attrs[name]
+
+    def get(self, name, default=None):
+        return self._attrs.get(name, default)
+
+    def new(self, name, type, domain):
+        if name in self._attrs:
+            raise RuntimeError(f"attribute '{name}' exists")
+        attr = FakeAttribute(name, type, domain, self._mesh.domain_size(domain), self)
+        self._attrs[name] = attr
+        return attr
+
+    def remove(self, attr):
+        del self._attrs[attr.name]
+
+
+class FakeCollection:
+    """vertices / edges / loops / polygons: a length plus foreach_get of one int field."""
+
+    def __init__(self, size, fields=None):
+        self._size = size
+        self._fields = fields or {}
+
+    def __len__(self):
+        return self._size
+
+    def foreach_get(self, prop, buf):
+        values = self._fields[prop]
+        if len(buf) != len(values):
+            raise RuntimeError("foreach_get: array length mismatch")
+        buf[:] = values
+
+
+class FakeMesh:
+    def __init__(self, vert_count, faces=()):
+        self.session_uid = next(_uids)
+        faces = [list(f) for f in faces]
+        edges = sorted({tuple(sorted((f[i], f[(i + 1) % len(f)]))) for f in faces for i in range(len(f))})
+        corner_verts = [v for f in faces for v in f]
+        loop_start = list(itertools.accumulate([0] + [len(f) for f in faces[:-1]])) if faces else []
+
+        self.vertices = FakeCollection(vert_count)
+        self.edges = FakeCollection(len(edges), {"vertices": [v for e in edges for v in e]})
+        self.loops = FakeCollection(len(corner_verts), {"vertex_index": corner_verts})
+        self.polygons = FakeCollection(len(faces), {"loop_start": loop_start})
+        self.attributes = FakeAttributes(self)
+        self.update_count = 0
+
+    def domain_size(self, domain):
+        return {
+            'POINT': len(self.vertices),
+            'EDGE': len(self.edges),
+            'CORNER': len(self.loops),
+            'FACE': len(self.polygons),
+        }[domain]
+
+    def update(self):
+        self.update_count += 1
+
+    def add_float_attr(self, name, values, size=None):
+        """Create a FLOAT/POINT attribute, optionally with a different length (stale topology)."""
+        attr = FakeAttribute(name, 'FLOAT', 'POINT', len(values) if size is None else size, self.attributes)
+        for i, v in enumerate(values[:len(attr.data)]):
+            attr.data._values[i] = v
+        self.attributes._attrs[name] = attr
+        return attr
+
+
+class FakeLayer:
+    """The fields of a SculptMaskLayerItem the engine modules read."""
+
+    def __init__(self, name, attr_name, enabled=True, blend_mode='ADD', opacity=1.0):
+        self.name = name
+        self.attr_name = attr_name
+        self.enabled = enabled
+        self.blend_mode = blend_mode
+        self.opacity = opacity
+        self.tag = ""
+        self.coverage = 0.0
+        self.modified = 0
+
+
+class FakeObject:
+    def __init__(self, mesh):
+        self.session_uid = next(_uids)
+        self.type = 'MESH'
+        self.data = mesh
+        self.sculpt_mask_layers = []
@@ -0,0 +1,133 @@
+"""Reference oracles: the plain Python implementations as they were before any
+vectorized path existed. Don't "optimize" this file, the tests compare against it.
+"""
+
+
+def copy_attr_values(src_attr, dst_attr, vert_count, allow_mismatch=False):
+    src_len = len(src_attr.data)
+    dst_len = len(dst_attr.data)
+
+    if (src_len == vert_count) and (dst_len == vert_count):
+        buf = [0.0] * vert_count
+        src_attr.data.foreach_get("value", buf)
+        dst_attr.data.foreach_set("value", buf)
+        return "OK"
+
+    if not allow_mismatch:
+        raise RuntimeError("Vertex count mismatch; cannot copy safely.")
+
+    # Best effort mode for mismatched topo.
+    n = min(src_len, dst_len, vert_count)
+    buf = [0.0] * src_len
+    src_attr.data.foreach_get("value", buf)
+
+    for i in range(dst_len):
+        dst_attr.data[i].value = buf[i] if i < n else 0.0
+
+    return "MISMATCH"
+
+
+def add_subtract(src, dst, vert_count, op_mode):
+    """The add (1) / subtract (2) loop from SCULPTMASK_OT_preview_toggle."""
+    n = min(len(src.data), len(dst.data), vert_count)
+    buf_src = [0.0] * len(src.data)
+    buf_dst = [0.0] * len(dst.data)
+    src.data.foreach_get("value", buf_src)
+    dst.data.foreach_get("value", buf_dst)
+
+    if op_mode == 1:
+        for i in range(n):
+            v = buf_dst[i] + buf_src[i]
+            if v < 0.0:
+                v = 0.0
+            elif v > 1.0:
+                v = 1.0
+            buf_dst[i] = v
+    else:
+        for i in range(n):
+            v = buf_dst[i] - buf_src[i]
+            if v < 0.0:
+                v = 0.0
+            elif v > 1.0:
+                v = 1.0
+            buf_dst[i] = v
+
+    dst.data.foreach_set("value", buf_dst)
+
+
+def invert(attr):
+    """The loop from SCULPTMASK_OT_mask_invert."""
+    n = len(attr.data)
+    if n == 0:
+        return
+    buf = [0.0] * n
+    attr.data.foreach_get("value", buf)
+    for i in range(n):
+        v = 1.0 - buf[i]
+        if v < 0.0:
+            v = 0.0
+        elif v > 1.0:
+            v = 1.0
+        buf[i] = v
+    attr.data.foreach_set("value", buf)
+
+
+def hidden_faces(hidden_vert, faces):
+    """A face is hidden as soon as one of its corners is."""
+    return [any(hidden_vert[v] for v in face) for face in faces]
+
+
+def unique_attr_name(mesh, base):
+    """utils.unique_attr_name before the name index: rebuild the set every call."""
+    existing = {a.name for a in mesh.attributes}
+    if base not in existing:
+        return base
+    i = 1
+    while f"{base}_{i:02d}" in existing:
+        i += 1
+    return f"{base}_{i:02d}"
+
+
+def _clamp(v):
+    if v < 0.0:
+        return 0.0
+    if v > 1.0:
+        return 1.0
+    return v
+
+
+def composite(layers, n):
+    """Full stack composite, one vertex at a time.
+
+    layers: (values, enabled, blend_mode, opacity) top to bottom; each lower
+    layer is blended over the result of the ones above it.
+    """
+    comp = [0.0] * n
+    for values, enabled, mode, opacity in layers:
+        if not enabled:
+            continue
+        for i in range(n):
+            b = comp[i]
+            v = values[i] if i < len(values) else 0.0
+            if mode == 'ADD':
+                out = b + v
+            elif mode == 'SUBTRACT':
+                out = b - v
+            elif mode == 'MULTIPLY':
+                out = b * v
+            elif mode == 'LIGHTEN':
+                out = v if v > b else b
+            elif mode == 'DARKEN':
+                out = v if v < b else b
+            else:
+                out = v
+            out = _clamp(out)
+            if opacity < 1.0:
+                out = b + (out - b) * opacity
+            comp[i] = out
+    return comp
+
+
+def quantize_roundtrip(values, levels=65535):
+    """What a mask looks like after being stored at 16 bits and read back (NaN as 0)."""
+    return [round(_clamp(v if v == v else 0.0) * levels) / levels for v in values]
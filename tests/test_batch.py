@@ -0,0 +1,36 @@
+import importlib
+
+import pytest
+
+batch = importlib.import_module("sculpt_mask_layers.batch")
+
+
+@pytest.mark.parametrize("text", [
+    "clip(v * 2, 0, 1)",
+    "where(v > 0.5, 1.0, 0.0)",
+    "1 - abs(v - 0.5) * 2",
+    "round(v)",
+])
+def test_expr_allows_math(text):
+    batch.compile_expr(text)
+
+
+@pytest.mark.parametrize("text", [
+    "v.__class__",
+    "v.__class__.__mro__[-1].__subclasses__()",
+    "__import__('os')",
+    "(lambda: v)()",
+    "v[0]",
+    "'text'",
+    "open",
+    "[v for v in ()]",
+])
+def test_expr_rejects_everything_else(text):
+    with pytest.raises(ValueError):
+        batch.compile_expr(text)
+
+
+def test_missing_blender_is_a_failed_file(tmp_path):
+    out = batch._run_one(str(tmp_path / "no-blender-here"), "scene.blend", "{}", timeout=5)
+    assert out["ok"] is False
+    assert "Could not run Blender" in out["error"]
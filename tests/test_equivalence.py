@@ -0,0 +1,381 @@
+"""Optimized paths against the plain Python reference oracles in reference.py.
+
+Covers the array math (combine, invert, regions, face hiding), incremental
+stack recomposite vs a full per-vertex composite, snapshot quantization and the
+attribute name index vs the old set-rebuild loop.
+
+Inputs are random per seed: sizes from empty to large, mismatched attribute
+lengths, out-of-range values and NaNs. Everything goes through float32 storage
+in the fake attributes, so results are compared with a small tolerance.
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import reference  # noqa: E402
+from fakes import FakeLayer, FakeMesh, FakeObject  # noqa: E402
+
+SEEDS = range(24)
+ATOL = 1e-6
+
+
+def _rng(seed):
+    return np.random.default_rng(1000 + seed)
+
+
+def _size(rng, seed):
+    if seed % 8 == 0:
+        return 0
+    if seed % 8 == 1:
+        return int(rng.integers(1, 4))
+    if seed % 8 == 7:
+        return int(rng.integers(50_000, 120_000))
+    return int(rng.integers(10, 5_000))
+
+
+def _values(rng, n, nan=True):
+    v = rng.random(n).astype(np.float32)
+    if n:
+        out = rng.random(n) < 0.1
+        v[out] = rng.uniform(-2.0, 3.0, size=int(out.sum()))
+        v[rng.random(n) < 0.05] = 0.0
+        v[rng.random(n) < 0.05] = 1.0
+        if nan:
+            v[rng.random(n) < 0.02] = np.nan
+    return v.tolist()
+
+
+def _read(attr):
+    buf = np.empty(len(attr.data), dtype=np.float32)
+    attr.data.foreach_get("value", buf)
+    return buf
+
+
+def _assert_close(actual, expected, atol=ATOL):
+    actual = np.asarray(actual, dtype=np.float32)
+    expected = np.asarray(expected, dtype=np.float32)
+    assert actual.shape == expected.shape
+    np.testing.assert_allclose(actual, expected, rtol=0.0, atol=atol, equal_nan=True)
+
+
+def _mesh_with(rng, n, src_len=None, dst_len=None):
+    mesh = FakeMesh(n)
+    src_len = n if src_len is None else src_len
+    dst_len = n if dst_len is None else dst_len
+    mesh.add_float_attr("mask__src", _values(rng, src_len))
+    mesh.add_float_attr(".sculpt_mask", _values(rng, dst_len))
+    return mesh
+
+
+def _twin_meshes(seed, mismatch=False):
+    """Two meshes with identical random data, one for the oracle, one for the fast path."""
+    rng = _rng(seed)
+    n = _size(rng, seed)
+    src_len = dst_len = n
+    if mismatch:
+        src_len = max(0, n + int(rng.integers(-n // 2 - 1, n // 2 + 2)))
+        dst_len = max(0, n + int(rng.integers(-n // 2 - 1, n // 2 + 2)))
+    state = rng.bit_generator.state
+    a = _mesh_with(rng, n, src_len, dst_len)
+    rng.bit_generator.state = state
+    b = _mesh_with(rng, n, src_len, dst_len)
+    return n, a, b
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("mode", [1, 2])
+def test_combine_matches_add_subtract_loops(addon, seed, mode):
+    arrays = addon("arrays")
+    n, ref_mesh, mesh = _twin_meshes(seed, mismatch=seed % 3 == 1)
+
+    reference.add_subtract(ref_mesh.attributes["mask__src"], ref_mesh.attributes[".sculpt_mask"], n, mode)
+
+    src = arrays.read_point_values(mesh, "mask__src")
+    dst = arrays.read_point_values(mesh, ".sculpt_mask")
+    m = min(len(src), len(dst), n)
+    dst[:m] = arrays.combine(dst[:m], src[:m], mode)
+
+    _assert_close(dst, _read(ref_mesh.attributes[".sculpt_mask"]))
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_combine_apply_matches_copy(addon, seed):
+    arrays = addon("arrays")
+    n, ref_mesh, mesh = _twin_meshes(seed)
+
+    reference.copy_attr_values(ref_mesh.attributes["mask__src"], ref_mesh.attributes[".sculpt_mask"], n)
+    src = arrays.read_point_values(mesh, "mask__src")
+    dst = arrays.read_point_values(mesh, ".sculpt_mask")
+
+    _assert_close(arrays.combine(dst, src, 0), _read(ref_mesh.attributes[".sculpt_mask"]))
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_invert_matches_reference(addon, seed):
+    arrays = addon("arrays")
+    n, ref_mesh, mesh = _twin_meshes(seed)
+
+    reference.invert(ref_mesh.attributes[".sculpt_mask"])
+    out = arrays.invert(arrays.read_point_values(mesh, ".sculpt_mask"))
+
+    _assert_close(out, _read(ref_mesh.attributes[".sculpt_mask"]))
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_read_point_values_padding_matches_mismatch_copy(addon, seed):
+    arrays = addon("arrays")
+    n, ref_mesh, mesh = _twin_meshes(seed, mismatch=True)
+
+    # Copying into an n-long attribute is what the padding rule mirrors.
+    ref_dst = ref_mesh.add_float_attr("mask__dst", [0.0] * n)
+    reference.copy_attr_values(ref_mesh.attributes["mask__src"], ref_dst, n, allow_mismatch=True)
+
+    _assert_close(arrays.read_point_values(mesh, "mask__src", n), _read(ref_dst))
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("sparse", [True, False])
+@pytest.mark.parametrize("op", ["invert", "clear", "apply", "add", "subtract"])
+def test_region_ops_match_reference_on_region(addon, seed, sparse, op):
+    arrays = addon("arrays")
+    regions = addon("regions")
+    n, ref_mesh, mesh = _twin_meshes(seed)
+    rng = _rng(seed)
+
+    if n:
+        k = max(1, int(n * regions.SPARSE_FRACTION * 0.5)) if sparse else max(1, n // 2)
+        indices = np.sort(rng.choice(n, size=min(k, n), replace=False)).astype(np.int64)
+    else:
+        indices = np.zeros(0, dtype=np.int64)
+
+    # Oracle: run the whole-mesh reference, keep its result only inside the region.
+    before = _read(ref_mesh.attributes[".sculpt_mask"])
+    ref_src, ref_dst = ref_mesh.attributes["mask__src"], ref_mesh.attributes[".sculpt_mask"]
+    if op == "invert":
+        reference.invert(ref_dst)
+    elif op == "clear":
+        ref_dst.data.foreach_set("value", [0.0] * n)
+    elif op == "apply":
+        reference.copy_attr_values(ref_src, ref_dst, n)
+    else:
+        reference.add_subtract(ref_src, ref_dst, n, 1 if op == "add" else 2)
+    expected = before.copy()
+    expected[indices] = _read(ref_dst)[indices]
+
+    dst = regions.RegionValues(mesh.attributes[".sculpt_mask"], indices)
+    if op == "invert":
+        dst.write(arrays.invert(dst.values))
+    elif op == "clear":
+        dst.write(np.zeros(len(dst.indices), dtype=np.float32))
+    else:
+        src_vals = regions.RegionValues(mesh.attributes["mask__src"], indices).values
+        mode = {"apply": 0, "add": 1, "subtract": 2}[op]
+        dst.write(arrays.combine(dst.values, src_vals, mode))
+
+    if n > 2 / regions.SPARSE_FRACTION:
+        # Smaller meshes can't hold a region below the sparse cut-off.
+        assert (dst.full is None) == sparse
+    _assert_close(_read(mesh.attributes[".sculpt_mask"]), expected)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("mode", ["ADD", "SUBTRACT"])
+def test_stack_blend_matches_add_subtract_loops(addon, seed, mode):
+    stack = addon("stack")
+    arrays = addon("arrays")
+    n, ref_mesh, mesh = _twin_meshes(seed)
+
+    reference.add_subtract(
+        ref_mesh.attributes["mask__src"], ref_mesh.attributes[".sculpt_mask"], n, 1 if mode == "ADD" else 2
+    )
+    base = arrays.read_point_values(mesh, ".sculpt_mask")
+    layer = arrays.read_point_values(mesh, "mask__src")
+
+    _assert_close(stack.blend(base, layer, mode, 1.0), _read(ref_mesh.attributes[".sculpt_mask"]))
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_hide_face_reduction_matches_reference(addon, seed):
+    visibility = addon("visibility")
+    rng = _rng(seed)
+    n = max(4, _size(rng, seed) // 4)
+    face_count = int(rng.integers(1, n))
+    faces = [
+        rng.choice(n, size=int(rng.integers(3, min(6, n + 1))), replace=False).tolist()
+        for _ in range(face_count)
+    ]
+    mesh = FakeMesh(n, faces)
+    values = np.asarray(_values(rng, n), dtype=np.float32)
+    threshold = float(rng.random())
+
+    visible = visibility.hide_outside(mesh, values, threshold)
+
+    hidden_vert = (values < threshold).tolist()
+    expected = reference.hidden_faces(hidden_vert, faces)
+    got = [bool(v) for v in mesh.attributes[".hide_poly"].data._values]
+    assert got == expected
+    assert visible == expected.count(False)
+
+
+BLEND_MODES = ('MIX', 'ADD', 'SUBTRACT', 'MULTIPLY', 'LIGHTEN', 'DARKEN')
+
+
+def _new_stack_layer(rng, obj, index):
+    mesh = obj.data
+    attr_name = f"mask__layer_{index:02d}"
+    mesh.add_float_attr(attr_name, _values(rng, len(mesh.vertices), nan=False))
+    layer = FakeLayer(f"Layer {index}", attr_name)
+    _randomize_blend(rng, layer)
+    return layer
+
+
+def _randomize_blend(rng, layer):
+    layer.blend_mode = BLEND_MODES[int(rng.integers(len(BLEND_MODES)))]
+    layer.opacity = 1.0 if rng.random() < 0.5 else float(rng.random())
+
+
+def _edit_stack(rng, stack, obj, counter):
+    """One random edit of the kind the UI makes between two recomposites."""
+    layers = obj.sculpt_mask_layers
+    kind = rng.choice(["toggle", "blend", "values", "move", "add", "remove"]) if layers else "add"
+    if kind == "add":
+        layers.insert(int(rng.integers(len(layers) + 1)), _new_stack_layer(rng, obj, next(counter)))
+        return
+    i = int(rng.integers(len(layers)))
+    if kind == "toggle":
+        layers[i].enabled = not layers[i].enabled
+    elif kind == "blend":
+        _randomize_blend(rng, layers[i])
+    elif kind == "values":
+        # Same contract as assign_mask_to_layer: write, then invalidate.
+        attr = obj.data.attributes[layers[i].attr_name]
+        attr.data.foreach_set("value", _values(rng, len(attr.data), nan=False))
+        stack.invalidate(obj, layers[i].attr_name)
+    elif kind == "move":
+        j = int(rng.integers(len(layers)))
+        layers[i], layers[j] = layers[j], layers[i]
+    else:
+        del layers[i]
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("thinned", [False, True])
+def test_incremental_recomposite_matches_full_composite(addon, monkeypatch, seed, thinned):
+    stack = addon("stack")
+    stack.clear_cache()
+    rng = _rng(seed)
+    # The oracle is a per-vertex loop per layer per step, keep it affordable.
+    n = min(_size(rng, seed), 6_000)
+    obj = FakeObject(FakeMesh(n))
+    if thinned:
+        # Room for about two prefixes, so only every few layers keeps one.
+        monkeypatch.setattr(stack, "_PREFIX_BUDGET_BYTES", max(1, n * 4 * 2))
+
+    counter = iter(range(10_000))
+    for _ in range(int(rng.integers(1, 6))):
+        obj.sculpt_mask_layers.append(_new_stack_layer(rng, obj, next(counter)))
+
+    for _step in range(12):
+        _edit_stack(rng, stack, obj, counter)
+        got = stack.recomposite(obj)
+
+        layers = [
+            (_read(obj.data.attributes[l.attr_name]).tolist(), l.enabled, l.blend_mode, l.opacity)
+            for l in obj.sculpt_mask_layers
+        ]
+        expected = reference.composite(layers, n)
+        # float32 blending against a float64 loop, over several layers.
+        _assert_close(got, expected, atol=1e-5)
+        _assert_close(_read(obj.data.attributes[".sculpt_mask"]), expected, atol=1e-5)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_snapshot_restore_matches_reference_quantization(addon, seed):
+    snapshots = addon("snapshots")
+    snapshots.clear()
+    rng = _rng(seed)
+    n = _size(rng, seed)
+    mesh = FakeMesh(n)
+    obj = FakeObject(mesh)
+    mask = mesh.add_float_attr(".sculpt_mask", [0.0] * n)
+
+    if n == 0:
+        assert not snapshots.take_snapshot(obj, 4, force=True)
+        return
+
+    # NaN included: a layer written outside the add-on can carry it into the mask.
+    written = []
+    for _ in range(3):
+        values = _values(rng, n)
+        mask.data.foreach_set("value", values)
+        assert snapshots.take_snapshot(obj, 2, force=True)
+        written.append(_read(mask))
+    # Nothing changed since the last one, so nothing new is stored (and the
+    # sampled check doesn't choke on NaN).
+    assert not snapshots.take_snapshot(obj, 2)
+
+    kept = written[-2:][::-1]
+    assert len(snapshots.snapshots_for(obj)) == len(kept)
+    for index, values in enumerate(kept):
+        snapshots.restore_snapshot(obj, index)
+        restored = _read(mask)
+        # float32 vs float64 rounding can land a tie on the other level...
+        _assert_close(restored, reference.quantize_roundtrip(values.tolist()), atol=1.0 / 65535 + 1e-7)
+        # ...but never further than half a level from the clamped input.
+        _assert_close(restored, np.clip(np.nan_to_num(values, nan=0.0), 0.0, 1.0), atol=0.51 / 65535)
+
+
+def _copy_names(mesh):
+    scratch = FakeMesh(1)
+    for attr in mesh.attributes:
+        scratch.attributes.new(attr.name, 'FLOAT', 'POINT')
+    return scratch
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_name_index_matches_set_rebuild(addon, seed):
+    utils = addon("utils")
+    utils.clear_attr_name_index()
+    rng = _rng(seed)
+    mesh = FakeMesh(2)
+    mesh.add_float_attr("UVMap", [0.0, 0.0])
+    bases = ["mask__a", "mask__b", "mask__a_01", "mask__cavity"]
+
+    def pick(seq):
+        return seq[int(rng.integers(len(seq)))]
+
+    for _step in range(150):
+        masks = [a.name for a in mesh.attributes if a.name.startswith("mask__")]
+        kind = pick(["create", "create", "bulk", "remove", "rename", "outside"])
+        if kind in ("remove", "rename") and not masks:
+            kind = "create"
+
+        if kind == "create":
+            base = pick(bases)
+            expected = reference.unique_attr_name(mesh, base)
+            got = utils.unique_attr_name(mesh, base)
+            assert got == expected
+            utils.new_mesh_attribute(mesh, got, 'FLOAT', 'POINT')
+        elif kind == "bulk":
+            wanted = [pick(bases) for _ in range(int(rng.integers(1, 5)))]
+            scratch = _copy_names(mesh)
+            expected = []
+            for base in wanted:
+                expected.append(reference.unique_attr_name(scratch, base))
+                scratch.attributes.new(expected[-1], 'FLOAT', 'POINT')
+            got = utils.unique_attr_names(mesh, wanted)
+            assert got == expected
+            for name in got:
+                utils.new_mesh_attribute(mesh, name, 'FLOAT', 'POINT')
+        elif kind == "remove":
+            assert utils.remove_mesh_attribute(mesh, pick(masks))
+        elif kind == "rename":
+            old, new = pick(masks), pick(bases)
+            expected = new
+            if new in mesh.attributes and new != old:
+                expected = reference.unique_attr_name(mesh, new)
+            assert utils.rename_mesh_attribute(mesh, old, new) == expected
+        else:
+            # Another add-on or the user adding an attribute behind the index.
+            mesh.attributes.new(reference.unique_attr_name(mesh, pick(bases)), 'FLOAT', 'POINT')
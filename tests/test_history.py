@@ -0,0 +1,89 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from fakes import FakeMesh  # noqa: E402
+
+
+def _f32(values):
+    return np.asarray(values, dtype=np.float32)
+
+
+def test_out_of_band_write_between_assigns(addon):
+    history = addon("history")
+    history.clear()
+    mesh = FakeMesh(4)
+    name = "mask__layer"
+
+    # Assign A, binarize in place without recording, then assign N.
+    empty = _f32([0, 0, 0, 0])
+    a = _f32([1, 0.7, 0, 0.3])
+    binary = _f32([1, 1, 0, 0])
+    n = _f32([1, 1, 0, 0.3])
+    history.record(mesh, name, empty, a)
+    history.record(mesh, name, binary, n)
+
+    revs = history.revisions(mesh, name)
+    np.testing.assert_array_equal(history.values_at(mesh, name, revs[-1][0]), n)
+    np.testing.assert_array_equal(history.values_at(mesh, name, revs[-2][0]), binary)
+    np.testing.assert_array_equal(history.values_at(mesh, name, 1), a)
+    np.testing.assert_array_equal(history.values_at(mesh, name, 0), empty)
+
+
+def test_no_resync_revision_when_in_step(addon):
+    history = addon("history")
+    history.clear()
+    mesh = FakeMesh(3)
+    history.record(mesh, "mask__a", _f32([0, 0, 0]), _f32([1, 0, 0]))
+    history.record(mesh, "mask__a", _f32([1, 0, 0]), _f32([1, 1, 0]))
+    assert len(history.revisions(mesh, "mask__a")) == 3
+
+
+@pytest.mark.parametrize("seed", range(16))
+def test_every_kept_revision_rebuilds_exactly(addon, seed):
+    history = addon("history")
+    history.clear()
+    rng = np.random.default_rng(2000 + seed)
+    n = int(rng.choice([0, 1, 17, 5_000, 60_000]))
+    mesh = FakeMesh(n)
+    name = "mask__layer"
+
+    # Oracle: a full copy of every revision, resyncs included.
+    states = []
+    current = rng.random(n).astype(np.float32)
+    for _step in range(int(rng.integers(1, 40))):
+        if rng.random() < 0.25:
+            # Something wrote the layer without recording (undo, a batch job, ...).
+            current = current.copy()
+            current[rng.random(n) < 0.1] = rng.random()
+        new = current.copy()
+        changed = rng.random(n) < rng.choice([0.0, 0.01, 0.5, 1.0])
+        new[changed] = rng.random(int(changed.sum())).astype(np.float32)
+        new[rng.random(n) < 0.01] = np.nan
+
+        history.record(mesh, name, current, new)
+        if not states or not np.array_equal(states[-1], current, equal_nan=True):
+            states.append(current)
+        states.append(new)
+        current = new
+
+    revs = history.revisions(mesh, name)
+    # Default depth is 16 deltas, older ones get folded into the base.
+    assert len(revs) == min(len(states), 17)
+    for (revision, _time, _count), expected in zip(revs, states[-len(revs):]):
+        np.testing.assert_array_equal(history.values_at(mesh, name, revision), expected)
+
+
+def test_folded_base_keeps_the_delta_time(addon):
+    history = addon("history")
+    history.clear()
+    mesh = FakeMesh(2)
+    values = _f32([0, 0])
+    for step in range(20):
+        new = _f32([step + 1, 0])
+        history.record(mesh, "mask__a", values, new)
+        values = new
+    entry = history._histories[(mesh.session_uid, "mask__a")]
+    entry["deltas"][0]["time"] = 12345.0
+    history.record(mesh, "mask__a", values, _f32([0, 1]))
+    assert history.revisions(mesh, "mask__a")[0][1] == 12345.0
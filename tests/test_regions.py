@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from fakes import FakeLayer, FakeMesh, FakeObject  # noqa: E402
+
+
+def _write(mesh, name, values, layer, utils):
+    """What touch_layer does after a write, minus the bpy parts."""
+    mesh.attributes[name].data.foreach_set("value", values)
+    # Blender keeps modified as whole seconds, so two writes within the same
+    # second leave it unchanged; the cache mustn't rely on it.
+    layer.modified = int(time.time())
+    utils.bump_attr_version(mesh, name)
+
+
+def test_layer_region_follows_rewrites_within_the_same_second(addon):
+    regions = addon("regions")
+    utils = addon("utils")
+    regions.clear()
+    mesh = FakeMesh(10)
+    obj = FakeObject(mesh)
+    utils.new_mesh_attribute(mesh, "mask__region", 'FLOAT', 'POINT')
+    layer = FakeLayer("Region", "mask__region")
+    layer.modified = int(time.time())
+
+    _write(mesh, "mask__region", [1.0] * 5 + [0.0] * 5, layer, utils)
+    first = regions.resolve(obj, 'LAYER', layer, 0.5)
+    np.testing.assert_array_equal(first, np.arange(5))
+
+    stamp = layer.modified
+    _write(mesh, "mask__region", [0.0] * 5 + [1.0] * 5, layer, utils)
+    layer.modified = stamp
+    np.testing.assert_array_equal(regions.resolve(obj, 'LAYER', layer, 0.5), np.arange(5, 10))
+
+
+def test_layer_region_is_cached_until_written(addon):
+    regions = addon("regions")
+    utils = addon("utils")
+    regions.clear()
+    mesh = FakeMesh(4)
+    obj = FakeObject(mesh)
+    utils.new_mesh_attribute(mesh, "mask__r", 'FLOAT', 'POINT')
+    layer = FakeLayer("R", "mask__r")
+    _write(mesh, "mask__r", [1.0, 0.0, 1.0, 0.0], layer, utils)
+
+    assert regions.resolve(obj, 'LAYER', layer, 0.5) is regions.resolve(obj, 'LAYER', layer, 0.5)
+
+
+def test_recreated_attribute_does_not_reuse_the_old_region(addon):
+    regions = addon("regions")
+    utils = addon("utils")
+    regions.clear()
+    mesh = FakeMesh(4)
+    obj = FakeObject(mesh)
+    layer = FakeLayer("R", "mask__r")
+    utils.new_mesh_attribute(mesh, "mask__r", 'FLOAT', 'POINT')
+    mesh.attributes["mask__r"].data.foreach_set("value", [1.0, 1.0, 0.0, 0.0])
+    np.testing.assert_array_equal(regions.resolve(obj, 'LAYER', layer, 0.5), [0, 1])
+
+    utils.remove_mesh_attribute(mesh, "mask__r")
+    utils.new_mesh_attribute(mesh, "mask__r", 'FLOAT', 'POINT')
+    assert len(regions.resolve(obj, 'LAYER', layer, 0.5)) == 0
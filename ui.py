@@ -1,10 +1,13 @@
+import time
+
 import bpy
-from bpy.types import AddonPreferences, Operator, Panel, UIList
-from bpy.props import BoolProperty, StringProperty
 
-from .utils import active_mesh_object
+from bpy.types import AddonPreferences, Menu, Operator, Panel, UIList
+from bpy.props import BoolProperty, EnumProperty, FloatProperty, IntProperty, StringProperty
+
+from .props import layers_generation
+from .utils import ADDON_ID, active_mesh_object, addon_prefs, loaded_module
 
-ADDON_ID = __package__ if __package__ else "sculpt_mask_layers"
 DEFAULT_PANEL_NAME = "Mask Layers"
 
 
@@ -33,11 +36,22 @@ def _panel_name_update(self, context):
     _apply_panel_name(_sanitize_panel_name(self.panel_name))
 
 
-def sync_panel_name():
+def prepare_panel_category():
+    # Called before the panel is registered, so the saved tab name is used
+    # right away instead of unregistering/re-registering the panel on startup.
     addon = bpy.context.preferences.addons.get(ADDON_ID)
-    if not addon:
-        return
-    _apply_panel_name(_sanitize_panel_name(addon.preferences.panel_name))
+    if addon:
+        SCULPTMASK_PT_panel.bl_category = _sanitize_panel_name(addon.preferences.panel_name)
+
+def set_region(op, obj):
+    """Pass the object's region settings on to a RegionMixin operator button."""
+    op.region = obj.sculpt_mask_region
+    if obj.sculpt_mask_region == 'LAYER':
+        op.region_layer = obj.sculpt_mask_region_layer
+        op.region_threshold = obj.sculpt_mask_region_threshold
+    elif obj.sculpt_mask_region == 'VERTEX_GROUP':
+        op.region_group = obj.sculpt_mask_region_group
+
 
 def draw_mask_layers(layout, context):
     # Keeping this in one function so popup + sidebar stay in sync.
@@ -56,27 +70,58 @@ def draw_mask_layers(layout, context):
 
     col = row.column(align=True)
     col.operator("sculptmask.add_layer", text="", icon='ADD')
+    col.operator("sculptmask.add_layers", text="", icon='COLLECTION_NEW')
     col.operator("sculptmask.remove_layer", text="", icon='REMOVE')
     col.separator()
     col.operator("sculptmask.move_layer_up", text="", icon='TRIA_UP')
     col.operator("sculptmask.move_layer_down", text="", icon='TRIA_DOWN')
 
+    row = layout.row(align=True)
+    row.prop(obj, "sculpt_mask_stack_mode", icon='RENDERLAYERS')
+    if obj.sculpt_mask_stack_mode:
+        row.operator("sculptmask.stack_recomposite", text="", icon='FILE_REFRESH')
+        idx = obj.sculpt_mask_layers_index
+        if 0 <= idx < len(obj.sculpt_mask_layers):
+            item = obj.sculpt_mask_layers[idx]
+            row = layout.row(align=True)
+            row.prop(item, "blend_mode", text="")
+            row.prop(item, "opacity", slider=True)
+
+    idx = obj.sculpt_mask_layers_index
+    if 0 <= idx < len(obj.sculpt_mask_layers):
+        layout.prop(obj.sculpt_mask_layers[idx], "tag", icon='BOOKMARKS')
+
     layout.separator()
 
     # Main action block. I prefer keeping these together so the user sees them.
     col = layout.column(align=True)
-    col.operator("sculptmask.assign", text="Assign to selected layer", icon='EXPORT')
+    row = col.row(align=True)
+    row.operator("sculptmask.assign", text="Assign to selected layer", icon='EXPORT')
+    row.menu("SCULPTMASK_MT_layer_history", text="", icon='TIME')
     col.operator("sculptmask.new_layer_from_mask", text="New layer from mask", icon='MOD_MASK')
     col.operator("sculptmask.duplicate_layer", text="Duplicate selected layer", icon='DUPLICATE')
 
+    row = col.row(align=True)
+    row.operator("sculptmask.restore_snapshot", text="Restore last autosnapshot", icon='RECOVER_LAST').snapshot_index = 0
+    row.menu("SCULPTMASK_MT_snapshots", text="", icon='DOWNARROW_HLT')
+
     layout.separator()
     layout.label(text="Mask Operators")
 
+    col = layout.column(align=True)
+    col.prop(obj, "sculpt_mask_region", text="Region")
+    if obj.sculpt_mask_region == 'LAYER':
+        row = col.row(align=True)
+        row.prop_search(obj, "sculpt_mask_region_layer", obj, "sculpt_mask_layers", text="")
+        row.prop(obj, "sculpt_mask_region_threshold", slider=True)
+    elif obj.sculpt_mask_region == 'VERTEX_GROUP':
+        col.prop_search(obj, "sculpt_mask_region_group", obj, "vertex_groups", text="")
+
     col = layout.column(align=True)
 
     row = col.row(align=True)
-    row.operator("sculptmask.mask_invert", text="Invert", icon='ARROW_LEFTRIGHT')
-    row.operator("sculptmask.mask_clear", text="Clear", icon='X')
+    set_region(row.operator("sculptmask.mask_invert", text="Invert", icon='ARROW_LEFTRIGHT'), obj)
+    set_region(row.operator("sculptmask.mask_clear", text="Clear", icon='X'), obj)
 
     row = col.row(align=True)
     op = row.operator("sculptmask.mask_filter", text="Smooth", icon='MOD_SMOOTH')
@@ -96,13 +141,177 @@ def draw_mask_layers(layout, context):
     op = row.operator("sculptmask.mask_filter", text="Decrease Contrast", icon='REMOVE')
     op.filter_type = 'CONTRAST_DECREASE'
 
+    layout.separator()
+    layout.label(text="Layer Selection")
+
+    col = layout.column(align=True)
+    row = col.row(align=True)
+    row.operator("sculptmask.layer_threshold", text="Binarize", icon='IPO_CONSTANT')
+    row.operator("sculptmask.hide_by_layer", text="Hide Outside", icon='HIDE_ON')
+    row.operator("sculptmask.reveal_all", text="Reveal", icon='HIDE_OFF')
+
+    layout.separator()
+    layout.label(text="Generate Layer")
+
+    col = layout.column(align=True)
+
+    row = col.row(align=True)
+    row.operator("sculptmask.generate_mask", text="Cavity", icon='SHADING_RENDERED').generator = 'CAVITY'
+    row.operator("sculptmask.generate_mask", text="Edges", icon='EDGESEL').generator = 'CONVEX'
+
+    row = col.row(align=True)
+    row.operator("sculptmask.generate_mask", text="Height", icon='EMPTY_SINGLE_ARROW').generator = 'HEIGHT'
+    row.operator("sculptmask.generate_mask", text="Top Facing", icon='NORMALS_FACE').generator = 'DIRECTION'
+
+    layout.separator()
+    layout.operator("sculptmask.inspect_layers", text="Layer Footprint...", icon='MEMORY')
+
+
+# (object, settings, generation) -> (flags, order). Redraws while nothing changed
+# are a dict lookup no matter how many layers there are.
+_filter_cache = {}
+_FILTER_CACHE_LIMIT = 32
+
 
 class SCULPTMASK_UL_layers(UIList):
+    sort_mode: EnumProperty(
+        name="Sort",
+        items=(
+            ('NONE', "Stack Order", "Keep the layer order"),
+            ('NAME', "Name", "Sort by name"),
+            ('COVERAGE', "Coverage", "Sort by how much of the mesh the layer covers"),
+            ('MODIFIED', "Last Modified", "Most recently changed first"),
+        ),
+        default='NONE',
+    )
+    filter_tag: StringProperty(name="Tag", description="Only show layers with this tag", default="")
+
     def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
         row = layout.row(align=True)
-        op = row.operator("sculptmask.preview_toggle", text="", icon='MOD_MASK', emboss=False)
+        if data.sculpt_mask_stack_mode:
+            icon = 'HIDE_OFF' if item.enabled else 'HIDE_ON'
+        else:
+            icon = 'MOD_MASK'
+        op = row.operator("sculptmask.preview_toggle", text="", icon=icon, emboss=False)
         op.layer_index = index
+        set_region(op, data)
         row.prop(item, "name", text="", emboss=False)
+        if item.tag:
+            row.label(text=item.tag)
+
+    def draw_filter(self, context, layout):
+        row = layout.row(align=True)
+        row.prop(self, "filter_name", text="")
+        row.prop(self, "use_filter_invert", text="", icon='ARROW_LEFTRIGHT')
+        row = layout.row(align=True)
+        row.prop(self, "filter_tag", text="", icon='BOOKMARKS')
+        row.prop(self, "sort_mode", text="")
+        row.prop(self, "use_filter_sort_reverse", text="", icon='SORT_DESC')
+
+    def filter_items(self, context, data, propname):
+        items = getattr(data, propname)
+        n = len(items)
+        key = (
+            data.as_pointer(),
+            n,
+            self.filter_name,
+            self.filter_tag,
+            self.sort_mode,
+            layers_generation(),
+        )
+        cached = _filter_cache.get(key)
+        if cached is not None:
+            return cached
+
+        flags = []
+        if self.filter_name:
+            flags = bpy.types.UI_UL_list.filter_items_by_name(
+                self.filter_name, self.bitflag_filter_item, items, "name", reverse=False
+            )
+        if self.filter_tag:
+            tag = self.filter_tag.strip().lower()
+            if not flags:
+                flags = [self.bitflag_filter_item] * n
+            for i, item in enumerate(items):
+                if item.tag.strip().lower() != tag:
+                    flags[i] &= ~self.bitflag_filter_item
+
+        order = []
+        if self.sort_mode == 'NAME':
+            order = bpy.types.UI_UL_list.sort_items_by_name(items, "name")
+        elif self.sort_mode in {'COVERAGE', 'MODIFIED'}:
+            # Bulk read of the cached metadata, no attribute data is touched here.
+            values = [0.0 if self.sort_mode == 'COVERAGE' else 0] * n
+            items.foreach_get(self.sort_mode.lower(), values)
+            # Biggest / newest first feels more useful as the default.
+            ranked = sorted(range(n), key=values.__getitem__, reverse=True)
+            order = [0] * n
+            for pos, i in enumerate(ranked):
+                order[i] = pos
+
+        if len(_filter_cache) >= _FILTER_CACHE_LIMIT:
+            _filter_cache.clear()
+        _filter_cache[key] = (flags, order)
+        return flags, order
+
+
+def _age_text(timestamp):
+    age = int(time.time() - timestamp)
+    return f"{age // 60} min ago" if age >= 60 else f"{age} s ago"
+
+
+class SCULPTMASK_MT_snapshots(Menu):
+    bl_idname = "SCULPTMASK_MT_snapshots"
+    bl_label = "Autosnapshots"
+
+    def draw(self, context):
+        from . import snapshots
+
+        layout = self.layout
+        obj = active_mesh_object(context)
+        snaps = snapshots.snapshots_for(obj) if obj else []
+        if not snaps:
+            layout.label(text="No snapshots yet")
+            return
+        for i, snap in enumerate(snaps):
+            layout.operator("sculptmask.restore_snapshot", text=_age_text(snap["time"])).snapshot_index = i
+
+
+class SCULPTMASK_MT_layer_history(Menu):
+    bl_idname = "SCULPTMASK_MT_layer_history"
+    bl_label = "Layer History"
+
+    def draw(self, context):
+        layout = self.layout
+        obj = active_mesh_object(context)
+        # No need to load the history module just to find out it's empty.
+        history = loaded_module("history")
+        idx = obj.sculpt_mask_layers_index if obj else -1
+        revs = []
+        if history and 0 <= idx < len(obj.sculpt_mask_layers):
+            revs = history.revisions(obj.data, obj.sculpt_mask_layers[idx].attr_name)
+        if not revs:
+            layout.label(text="No revisions yet")
+        else:
+            current = revs[-1][0]
+            for rev, stamp, changed in reversed(revs):
+                if rev == 0:
+                    text = f"Base - {_age_text(stamp)}"
+                else:
+                    text = f"Rev {rev} - {_age_text(stamp)} - {changed} verts changed"
+                if rev == current:
+                    layout.label(text=f"{text} (current)", icon='CHECKMARK')
+                    continue
+                op = layout.operator("sculptmask.restore_revision", text=text)
+                op.layer_index = idx
+                op.revision = rev
+
+        layout.separator()
+        used = history.memory_bytes() if history else 0
+        prefs = addon_prefs()
+        limit = prefs.history_limit_mb if prefs else 0.0
+        layout.label(text=f"Memory: {used / (1024 * 1024):.1f} / {limit:.0f} MB")
+        layout.operator("sculptmask.clear_history", icon='TRASH')
 
 
 class SCULPTMASK_OT_popup(Operator):
@@ -144,11 +353,54 @@ class SculptMaskLayersPreferences(AddonPreferences):
         default=DEFAULT_PANEL_NAME,
         update=_panel_name_update,
     )
+    autosnapshot: BoolProperty(
+        name="Autosnapshot Mask",
+        description="Keep a few recent versions of the sculpt mask in memory",
+        default=True,
+    )
+    autosnapshot_interval: FloatProperty(
+        name="Interval",
+        description="Seconds between checks for a changed mask",
+        default=10.0,
+        min=1.0,
+        soft_max=300.0,
+        subtype='TIME_ABSOLUTE',
+    )
+    autosnapshot_count: IntProperty(
+        name="Snapshots",
+        description="How many recent masks to keep per object",
+        default=8,
+        min=1,
+        max=64,
+    )
+    history_depth: IntProperty(
+        name="Revisions per Layer",
+        description="How many earlier assigns each layer remembers",
+        default=16,
+        min=1,
+        max=256,
+    )
+    history_limit_mb: FloatProperty(
+        name="History Memory (MB)",
+        description="Oldest revisions of the least recently used layers are dropped past this",
+        default=64.0,
+        min=1.0,
+        soft_max=2048.0,
+    )
 
     def draw(self, context):
         layout = self.layout
         layout.prop(self, "show_n_panel")
         layout.prop(self, "panel_name")
+        row = layout.row(align=True)
+        row.prop(self, "autosnapshot")
+        sub = row.row(align=True)
+        sub.active = self.autosnapshot
+        sub.prop(self, "autosnapshot_interval")
+        sub.prop(self, "autosnapshot_count")
+        row = layout.row(align=True)
+        row.prop(self, "history_depth")
+        row.prop(self, "history_limit_mb")
         layout.separator()
         row = layout.row(align=True)
         row.operator("wm.url_open", text="GitHub").url = "https://github.com/tomankirilov/"
@@ -194,9 +446,15 @@ def remove_menu_hooks():
                 pass
 
 
-CLASSES = (
+# Registered on their own before everything else, see prepare_panel_category.
+PREFERENCES_CLASSES = (
     SculptMaskLayersPreferences,
+)
+
+CLASSES = (
     SCULPTMASK_UL_layers,
+    SCULPTMASK_MT_snapshots,
+    SCULPTMASK_MT_layer_history,
     SCULPTMASK_OT_popup,
     SCULPTMASK_PT_panel,
 )
@@ -1,3 +1,6 @@
+import itertools
+import sys
+
 import bpy
 
 SCULPT_MASK_ATTR = ".sculpt_mask"
@@ -6,6 +9,8 @@ ATTR_PREFIX = "mask__"
 # Small value so we don't accidentally compare against floats that are "almost zero".
 EPS = 1e-6
 
+ADDON_ID = __package__ if __package__ else "sculpt_mask_layers"
+
 
 def active_mesh_object(context):
     obj = context.object
@@ -14,10 +19,25 @@ def active_mesh_object(context):
     return obj
 
 
+def id_key(id_data):
+    # session_uid stays the same across renames and undo, the pointer doesn't.
+    return getattr(id_data, "session_uid", 0) or id_data.as_pointer()
+
+
+def loaded_module(name):
+    """Sibling module if something already imported it this session, else None."""
+    return sys.modules.get(f"{__package__}.{name}")
+
+
+def addon_prefs():
+    addon = bpy.context.preferences.addons.get(ADDON_ID)
+    return addon.preferences if addon else None
+
+
 def ensure_float_point_attr(mesh, name):
     attr = mesh.attributes.get(name)
     if attr is None:
-        attr = mesh.attributes.new(name=name, type='FLOAT', domain='POINT')
+        attr = new_mesh_attribute(mesh, name, 'FLOAT', 'POINT')
     else:
         if attr.domain != 'POINT' or attr.data_type != 'FLOAT':
             raise RuntimeError(f"Attribute '{name}' exists but is not FLOAT/POINT.")
@@ -45,14 +65,126 @@ def sanitize_layer_name(name: str) -> str:
     return s or "mask"
 
 
-def unique_attr_name(mesh, base):
-    existing = {a.name for a in mesh.attributes}
-    if base not in existing:
-        return base
-    i = 1
-    while f"{base}_{i:02d}" in existing:
+# Per (mesh, attribute): counter value from the last time the add-on wrote,
+# created, renamed or removed it. Caches of derived data key on this. The
+# counter never repeats within a session, so a deleted-and-recreated attribute
+# can't pick up an old entry either.
+_attr_versions = {}
+_version_counter = itertools.count(1)
+
+
+def clear_attr_versions():
+    _attr_versions.clear()
+
+
+def bump_attr_version(mesh, name):
+    _attr_versions[(id_key(mesh), name)] = next(_version_counter)
+
+
+def attr_version(mesh, name):
+    return _attr_versions.get((id_key(mesh), name), 0)
+
+
+# Per mesh: the attribute names we know about and the next suffix to try per base.
+# Kept up to date by the helpers in this file so allocating a name doesn't have
+# to walk every attribute (UVs, colors, ...) each time.
+_name_index = {}
+
+
+def clear_attr_name_index():
+    _name_index.clear()
+
+
+def _attr_name_index(mesh):
+    key = id_key(mesh)
+    index = _name_index.get(key)
+    # Cheap check that catches attributes added/removed outside the add-on.
+    if index is None or len(index["names"]) != len(mesh.attributes):
+        index = {"names": {a.name for a in mesh.attributes}, "next": {}}
+        _name_index[key] = index
+    return index
+
+
+def _split_suffix(name):
+    base, sep, num = name.rpartition("_")
+    if sep and len(num) >= 2 and num.isdigit():
+        return base, int(num)
+    return name, None
+
+
+def _index_add(mesh, name):
+    index = _name_index.get(id_key(mesh))
+    if index is not None:
+        index["names"].add(name)
+
+
+def _index_discard(mesh, name):
+    index = _name_index.get(id_key(mesh))
+    if index is None:
+        return
+    index["names"].discard(name)
+    # Let the freed suffix be picked again, same as before the index existed.
+    base, num = _split_suffix(name)
+    if num is not None and num < index["next"].get(base, 1):
+        index["next"][base] = max(1, num)
+
+
+def _allocate(mesh, index, base):
+    names = index["names"]
+    if base not in names:
+        # The live lookup guards against renames done outside the add-on.
+        if mesh.attributes.get(base) is None:
+            return base
+        names.add(base)
+
+    i = index["next"].get(base, 1)
+    while True:
+        candidate = f"{base}_{i:02d}"
         i += 1
-    return f"{base}_{i:02d}"
+        if candidate in names:
+            continue
+        if mesh.attributes.get(candidate) is not None:
+            names.add(candidate)
+            continue
+        break
+    index["next"][base] = i
+    return candidate
+
+
+def unique_attr_name(mesh, base):
+    return _allocate(mesh, _attr_name_index(mesh), base)
+
+
+def unique_attr_names(mesh, bases):
+    """Allocate one unique name per base in one go.
+
+    The names are reserved in the index, so the caller is expected to create
+    all of them right away (a failed create just triggers a rebuild later).
+    """
+    index = _attr_name_index(mesh)
+    out = []
+    for base in bases:
+        name = _allocate(mesh, index, base)
+        index["names"].add(name)
+        out.append(name)
+    return out
+
+
+def new_mesh_attribute(mesh, name, data_type, domain):
+    attr = mesh.attributes.new(name=name, type=data_type, domain=domain)
+    _index_add(mesh, attr.name)
+    bump_attr_version(mesh, attr.name)
+    return attr
+
+
+def remove_mesh_attribute(mesh, name):
+    attr = mesh.attributes.get(name)
+    if attr is None:
+        return False
+    mesh.attributes.remove(attr)
+    _index_discard(mesh, name)
+    bump_attr_version(mesh, name)
+    return True
 
 
 def rename_mesh_attribute(mesh, old_name: str, new_name: str) -> str:
@@ -68,6 +200,10 @@ def rename_mesh_attribute(mesh, old_name: str, new_name: str) -> str:
 
     try:
         attr.name = new_name
+        _index_discard(mesh, old_name)
+        _index_add(mesh, new_name)
+        bump_attr_version(mesh, old_name)
+        bump_attr_version(mesh, new_name)
     except Exception:
         # I hit weird cases where rename throws, so do the slow copy.
         src = attr
@@ -75,7 +211,7 @@ def rename_mesh_attribute(mesh, old_name: str, new_name: str) -> str:
         buf = [0.0] * len(src.data)
         src.data.foreach_get("value", buf)
         dst.data.foreach_set("value", buf)
-        mesh.attributes.remove(src)
+        remove_mesh_attribute(mesh, old_name)
 
     return new_name
 
@@ -0,0 +1,66 @@
+import numpy as np
+
+from .utils import loaded_module, new_mesh_attribute, remove_mesh_attribute
+
+HIDE_VERT_ATTR = ".hide_vert"
+HIDE_EDGE_ATTR = ".hide_edge"
+HIDE_POLY_ATTR = ".hide_poly"
+
+
+def _regions_changed(mesh):
+    regions = loaded_module("regions")
+    if regions:
+        regions.invalidate(mesh)
+
+
+def binarize(values, threshold, invert=False):
+    keep = values < threshold if invert else values >= threshold
+    return keep.astype(np.float32)
+
+
+def _bool_attr(mesh, name, domain):
+    attr = mesh.attributes.get(name)
+    if attr is not None and (attr.domain != domain or attr.data_type != 'BOOLEAN'):
+        remove_mesh_attribute(mesh, name)
+        attr = None
+    if attr is None:
+        attr = new_mesh_attribute(mesh, name, 'BOOLEAN', domain)
+    return attr
+
+
+def hide_outside(mesh, values, threshold, invert=False):
+    """Hide everything below threshold (above it with invert).
+
+    Faces are hidden as soon as one of their corners is hidden, done as a single
+    reduceat over the corner -> vertex map. Returns the number of visible faces.
+    """
+    hidden_vert = values >= threshold if invert else values < threshold
+
+    edges = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+    mesh.edges.foreach_get("vertices", edges)
+    hidden_edge = hidden_vert[edges.reshape(-1, 2)].any(axis=1)
+
+    face_count = len(mesh.polygons)
+    if face_count:
+        corner_verts = np.empty(len(mesh.loops), dtype=np.int32)
+        loop_start = np.empty(face_count, dtype=np.int32)
+        mesh.loops.foreach_get("vertex_index", corner_verts)
+        mesh.polygons.foreach_get("loop_start", loop_start)
+        hidden_poly = np.logical_or.reduceat(hidden_vert[corner_verts], loop_start)
+    else:
+        hidden_poly = np.zeros(0, dtype=bool)
+
+    _bool_attr(mesh, HIDE_VERT_ATTR, 'POINT').data.foreach_set("value", hidden_vert)
+    _bool_attr(mesh, HIDE_EDGE_ATTR, 'EDGE').data.foreach_set("value", hidden_edge)
+    _bool_attr(mesh, HIDE_POLY_ATTR, 'FACE').data.foreach_set("value", hidden_poly)
+    mesh.update()
+    _regions_changed(mesh)
+    return int(face_count - np.count_nonzero(hidden_poly))
+
+
+def reveal_all(mesh):
+    # No hide attributes at all is how Blender stores "everything visible".
+    for name in (HIDE_VERT_ATTR, HIDE_EDGE_ATTR, HIDE_POLY_ATTR):
+        remove_mesh_attribute(mesh, name)
+    mesh.update()
+    _regions_changed(mesh)